@@ -0,0 +1,64 @@
+"""
+Microbenchmarks for zpid and timestamp extraction, single value and batch modes
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_ids.py --rows 200000
+"""
+
+import argparse
+import re
+import timeit
+
+from zillow.ids import extract_zpid, extract_zpids, match_timestamp, parse_timestamps
+
+
+def uncompiled_zpid(url: str) -> str | None:
+    """
+    zpid extraction as previously done in the sitemap model
+    """
+    match = re.search("\\/([0-9]+)[_]zpid\\/", url)
+    return match.group(1) if match else None
+
+
+def uncompiled_timestamp(value: str) -> str | None:
+    """
+    Timestamp matching as previously done in the sitemap model
+    """
+    match = re.match("\\d{4}[-]\\d{2}[-]\\d{2}T\\d{2}\\:\\d{2}\\:\\d{2}Z", value)
+    return match.group(0) if match else None
+
+
+def main():
+    """
+    Runs the benchmarks and prints the cost per call
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    urls: list[str] = [
+        f"https://www.zillow.com/homedetails/{i}-Main-St-Atlanta-GA-30301/{2146990000 + i}_zpid/"
+        for i in range(args.rows)
+    ]
+    stamps: list[str] = [
+        f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T14:53:00Z" for i in range(args.rows)
+    ]
+
+    cases: dict = {
+        "zpid single (re.search str)": lambda: [uncompiled_zpid(u) for u in urls],
+        "zpid single (compiled)": lambda: [extract_zpid(u) for u in urls],
+        "zpid batch (Series)": lambda: extract_zpids(urls),
+        "timestamp single (re.match str)": lambda: [
+            uncompiled_timestamp(s) for s in stamps
+        ],
+        "timestamp single (compiled)": lambda: [match_timestamp(s) for s in stamps],
+        "timestamp batch (Datetime)": lambda: parse_timestamps(stamps),
+    }
+
+    for name, func in cases.items():
+        best: float = min(timeit.repeat(func, number=1, repeat=3))
+        print(f"{name:>32}: {best * 1e9 / args.rows:8.1f} ns/value")
+
+
+if __name__ == "__main__":
+    main()
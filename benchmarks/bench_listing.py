@@ -0,0 +1,42 @@
+"""
+Benchmarks locating and decoding the __NEXT_DATA__ payload of a listing page,
+byte scanner vs BeautifulSoup
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_listing.py --repeat 20
+"""
+
+import argparse
+import timeit
+from pathlib import Path
+
+from zillow.individual_property.extract.listing import collect_listing_attrs
+
+LISTING_HTML: Path = (
+    Path(__file__).parent.parent / "tests" / "assets" / "response" / "listing.html"
+)
+
+
+def main():
+    """
+    Runs the benchmark and prints the cost per listing
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    html_bytes: bytes = LISTING_HTML.read_bytes()
+
+    for name, fast in [("soup", False), ("scanner", True)]:
+        best: float = min(
+            timeit.repeat(
+                lambda: collect_listing_attrs.fn(html_bytes, fast),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(f"{name:>10}: {best * 1e3:8.2f} ms/listing")
+
+
+if __name__ == "__main__":
+    main()
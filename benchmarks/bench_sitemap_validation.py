@@ -0,0 +1,70 @@
+"""
+Benchmarks sitemap record validation, pydantic models vs Polars expressions
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_sitemap_validation.py --rows 200000
+"""
+
+import argparse
+import time
+
+import polars as pl
+
+from zillow.mongo_models.sitemap_model import PropertySet, validate_property_frame
+
+
+def make_records(rows: int) -> list[dict]:
+    """
+    Builds synthetic sitemap records
+    """
+    return [
+        {
+            "property_url": f"https://www.zillow.com/homedetails/{i}-Main-St-Atlanta-GA-30301/{2146990000 + i}_zpid/",
+            "last_modified": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T14:53:00Z",
+        }
+        for i in range(rows)
+    ]
+
+
+def pydantic_path(records: list[dict]) -> list[dict]:
+    """
+    Validation as done by PropertySet
+    """
+    return PropertySet.model_validate(records).model_dump()
+
+
+def frame_path(records: list[dict]) -> pl.DataFrame:
+    """
+    Validation with Polars expressions
+    """
+    return validate_property_frame(records)
+
+
+def main():
+    """
+    Runs the benchmark and prints the cost per million records
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    records: list[dict] = make_records(args.rows)
+
+    for name, func in [("pydantic", pydantic_path), ("polars", frame_path)]:
+        best: float = min(_timed(func, records) for _ in range(args.repeat))
+        per_million: float = best * 1_000_000 / args.rows
+        print(f"{name:>10}: {best:8.3f}s for {args.rows} rows, {per_million:8.3f}s/M")
+
+
+def _timed(func, records: list[dict]) -> float:
+    """
+    Times a single call
+    """
+    start: float = time.perf_counter()
+    func(records)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
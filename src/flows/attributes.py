@@ -2,48 +2,71 @@
 Monthly Attributes Run
 """
 
-from functools import reduce
-
 import polars as pl
 from prefect import flow
 
 from flows.pull_listing import query_zillow_listings
-from flows.utility import batch_task_results
+from flows.utility import (
+    batch_task_results,
+    return_recently_modified,
+    upsert_properties,
+)
+from zillow.cache import response_cache
 from zillow.mongo_models.sitemap_model import Property
+from zillow.sink import write_partitions
 from zillow.sitemap import (
-    collect_property_urls,
     collect_sitemap_indexes,
+    extract_property_urls,
     extract_sitemap_dir_urls,
-    extract_sitemap_urls,
 )
+from zillow.spool import SpoolHandle, spool
 
 
 @flow(name="Queue Zillow Property Listing Attributes")
-def queue_listings_attributes() -> pl.DataFrame:
+def queue_listings_attributes(
+    output: str | None = None, cache: str | None = None
+) -> pl.DataFrame:
     """
     Queues listings to scrape individual property attributes
 
-
+    Args:
+        output: Directory or ``s3-bucket/<block name>`` the listings are appended to
+        cache: Directory or ``s3-bucket/<block name>`` caching raw responses so
+            reruns skip the network
     """
-    sitemap_dir_html: bytes = extract_sitemap_dir_urls()
+    if cache is not None:
+        response_cache.use(cache)
+
+    sitemap_dir_html: SpoolHandle = extract_sitemap_dir_urls(spooled=True)
 
     sitemap_indexes: list = collect_sitemap_indexes(sitemap_dir_html)
 
-    results: list[list[Property]] = reduce(
-        lambda output, func: batch_task_results(func, output),
-        [extract_sitemap_urls, collect_property_urls],
-        sitemap_indexes,
-    )  # Tried unnesting this in the lower layer, didnt work, gave up and moved on oh well
+    spool.discard(sitemap_dir_html)
+
+    results: list[list[Property]] = batch_task_results(
+        extract_property_urls, sitemap_indexes
+    )
 
     results: list[dict] = [
         result for nested_result in results for result in nested_result
     ]
 
-    df = query_zillow_listings(results)
-    # properties_to_queue: dict = return_recently_modified(results)
+    properties_to_queue: list[dict] = return_recently_modified(results).to_dicts()
+
+    df = query_zillow_listings(properties_to_queue)
+
+    if output is not None:
+        write_partitions(df, "listings", output)
+
+    # Listings that failed to collect stay out of Mongo so the next diff retries them
+    collected: set[str] = set(df.get_column("zpid").cast(pl.String))
+
+    upsert_properties(
+        [record for record in properties_to_queue if record["zillow_id"] in collected]
+    )
 
     """
-    Need to add in worker deployment here as well as refresh rate for csrf token
+    Need to add in worker deployment here
     """
 
     return df
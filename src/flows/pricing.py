@@ -2,33 +2,45 @@
 Daily Pricing Query
 """
 
+import polars as pl
 from prefect import flow
 
-from flows.queryset import query_zillow_regions
+from flows.queryset import query_zillow_region_set
 from zillow.blocks import blocks
-from zillow.mongo_models.query_config import RegionDefinitionsRepo
+from zillow.cache import response_cache
+from zillow.csrf import MongoTokenStore, csrf_tokens
+from zillow.mongo_models.query_config import RegionConfig, RegionDefinitionsRepo
+from zillow.sink import write_partitions
 
 
 @flow(name="Queue Zillow Property Listings")
-def queue_prices():
+def queue_prices(output: str | None = None, cache: str | None = None) -> pl.DataFrame:
     """
     Queues listings to scrape via state
 
     Args:
-        state_code: Two character state abbreviation to supply
+        output: Directory or ``s3-bucket/<block name>`` the results are appended to
+        cache: Directory or ``s3-bucket/<block name>`` caching raw responses so
+            reruns skip the network
+    """
+    if cache is not None:
+        response_cache.use(cache)
 
+    database = (blocks.mongodb).get_client()["production"]
 
-    """
+    csrf_tokens.use_store(MongoTokenStore(database["csrf_zillow"]))
+
+    config_repo = RegionDefinitionsRepo(database)
 
-    config_repo = RegionDefinitionsRepo((blocks.mongodb).get_client()["production"])
+    configs: list[RegionConfig] = list(config_repo.iter_all())
 
-    configs = config_repo.get_all().root
+    df: pl.DataFrame = query_zillow_region_set(configs)
 
-    for region_config in configs:
-        query_zillow_regions(region_config)
+    if output is not None:
+        write_partitions(df, "pricing", output)
 
     """
-    Need to add in worker deployment here as well as refresh rate for csrf token
+    Need to add in worker deployment here
     """
 
-    return None
+    return df
@@ -2,62 +2,239 @@
 Worker Flow to pull and transform zillow listing
 """
 
-import random
-import time
-
+import httpx
 import polars as pl
 from prefect import flow, task, unmapped
+from prefect.artifacts import create_table_artifact
 from prefect.futures import PrefectFuture
-from prefecto.concurrency import BatchTask
+from prefecto.logging import get_prefect_or_default_logger
 
 from flows.utility import modify_param_on_retry
+from zillow.adaptive import THROTTLE_STATUS_CODES, AdaptiveBatchTask, controller
+from zillow.csrf import csrf_tokens
+from zillow.ids import extract_zpid, extract_zpids
+from zillow.individual_property.extract.engine import ListingFetcher
 from zillow.individual_property.extract.listing import collect_listing_attrs
-from zillow.individual_property.transform.listing import property_json_to_df
+from zillow.individual_property.property_model import Property as ListingProperty
+from zillow.individual_property.transform.listing import (
+    PROPERTY_SCHEMA,
+    properties_to_df,
+    property_jsons_to_df,
+    validate_property,
+)
 from zillow.mongo_models.sitemap_model import Property
+from zillow.ratelimit import rate_limiter
 from zillow.sitemap import extract_csrf_token, extract_listing_url
 
 
-@task(name="Collect Listing", description="Collects Listing Datafram")
-def listing_collection(property_dict: dict, csrf_token: str) -> pl.DataFrame:
+@task(name="Collect Listing", description="Collects Listing JSON")
+def listing_collection(property_dict: dict, csrf_token: str) -> dict:
     """
-    Handles request, json parse from html, and converstion to dataframe
+    Handles request and json parse from html
 
     Args:
         property_url: URL of the listing
         csrf_token: Token for use across each worker node
 
     Returns:
-        df: Dataframe for the listing
+        listing_json: Listing json holding the property attributes
     """
-    sleep_time: int = random.randint(50, 150)
-    time.sleep(sleep_time)
+    controller.pause()
+    rate_limiter.acquire("listing")
 
     csrf_token = modify_param_on_retry(csrf_token)
 
     properties: Property = Property.model_validate(property_dict)
 
-    html_bytes: bytes = extract_listing_url.submit(
-        properties.property_url, csrf_token
-    ).result()
-    listing_json: dict = collect_listing_attrs.submit(html_bytes).result()
-    df: pl.DataFrame = property_json_to_df.submit(listing_json).result()
+    # Called in process so the page and its JSON never become task results
+    html_bytes: bytes = extract_listing_url.fn(properties.property_url, csrf_token)
+    listing_json: dict = collect_listing_attrs.fn(html_bytes, keys=["property"])
+
+    return listing_json
+
+
+def fetch_listing(
+    property_url: str, csrf_token: str, retries: int = 1
+) -> tuple[bytes, str]:
+    """
+    Fetches a listing page in process, retrying HTTP failures. A 403 or 429 replaces
+    the csrf token before the next attempt.
+
+    Args:
+        property_url: URL of the listing
+        csrf_token: Token for use across each worker node
+        retries: Attempts after the first
+
+    Returns:
+        html_bytes: Listing page
+        csrf_token: Token the page was fetched with, for the next listing
+    """
+    for attempt in range(retries + 1):
+        controller.pause()
+        rate_limiter.acquire("listing")
+        try:
+            return extract_listing_url.fn(property_url, csrf_token), csrf_token
+        except httpx.HTTPError as error:
+            if attempt == retries:
+                raise
+            if (
+                isinstance(error, httpx.HTTPStatusError)
+                and error.response.status_code in THROTTLE_STATUS_CODES
+            ):
+                csrf_token = csrf_tokens.refresh(stale=csrf_token)
+
+
+@task(
+    name="Collect Fused Listing Batch",
+    description="Fetches and parses a batch of listings in a single task run",
+)
+def listing_fused_collection(
+    property_dicts: list[dict], csrf_token: str, retries: int = 1
+) -> pl.DataFrame:
+    """
+    Fetches, parses and transforms a batch of listings in process, one task run and
+    one result per batch. The outcome of every listing is recorded in a table
+    artifact.
+
+    Args:
+        property_dicts: Sitemap records of the listings
+        csrf_token: Token for use across each worker node
+        retries: Fetch attempts per listing after the first
+
+    Returns:
+        df: Every listing that was collected
+    """
+    logger = get_prefect_or_default_logger()
+
+    properties: list[ListingProperty] = []
+    failures: dict[str, str] = {}
+
+    for property_dict in property_dicts:
+        property_url: str = Property.model_validate(property_dict).property_url
+
+        try:
+            html_bytes, csrf_token = fetch_listing(property_url, csrf_token, retries)
+            properties.append(
+                validate_property(
+                    collect_listing_attrs.fn(html_bytes, keys=["property"])
+                )
+            )
+        except Exception as error:
+            failures[property_url] = repr(error)
+
+    for property_url, error in failures.items():
+        logger.warning(
+            f"Failed to collect zpid {extract_zpid(property_url)} "
+            f"({property_url}): {error}"
+        )
+
+    # Compact summary attached to this task run, counts in the description and only
+    # failures as rows
+    create_table_artifact(
+        table={
+            "zpid": extract_zpids(list(failures)).to_list(),
+            "listing": list(failures),
+            "error": list(failures.values()),
+        },
+        description=f"{len(properties)} listings collected, {len(failures)} failed",
+    )
+
+    return properties_to_df(properties)
+
+
+@task(
+    name="Collect Listing Batch", description="Collects and parses a batch of listings"
+)
+def listing_batch_collection(
+    property_dicts: list[dict], csrf_token: str, concurrency: int = 20
+) -> pl.DataFrame:
+    """
+    Fetches a batch of listings with the async engine in one task run while a
+    process pool parses the pages
+
+    Args:
+        property_dicts: Sitemap records of the listings
+        csrf_token: Token for use across each worker node
+        concurrency: Maximum number of requests in flight
+
+    Returns:
+        df: Every listing that was collected
+    """
+    logger = get_prefect_or_default_logger()
+
+    property_urls: list[str] = [
+        Property.model_validate(property_dict).property_url
+        for property_dict in property_dicts
+    ]
+
+    fetcher = ListingFetcher(concurrency=concurrency)
+    df, failures = fetcher.run_frame(property_urls, csrf_token)
+
+    for property_url, error in failures.items():
+        logger.warning(
+            f"Failed to collect zpid {extract_zpid(property_url)} "
+            f"({property_url}): {error}"
+        )
 
     return df
 
 
 @flow(name="Query Zillow Listing", description="Collects listing data")
-def query_zillow_listings(property_urls: list[dict]):
+def query_zillow_listings(
+    property_urls: list[dict],
+    engine: str = "async",
+    batch_size: int = 500,
+    concurrency: int = 20,
+):
     """
     Queries Zillow to extract listing json.
+
+    Args:
+        property_urls: Sitemap records of the listings
+        engine: ``async`` to fetch batches of listings with the async engine,
+            ``fused`` to fetch batches of listings sequentially in one task run each
+            or ``tasks`` to run one task per listing
+        batch_size: Listings per task run with the async and fused engines
+        concurrency: Requests in flight per task run with the async engine
     """
     csrf_token = extract_csrf_token()
 
-    batch_get = BatchTask(listing_collection, 60)
-
-    futures: list[PrefectFuture] = batch_get.map(property_urls, unmapped(csrf_token))
-
-    results: list = [future.result() for future in futures]
-
-    df: pl.DataFrame = pl.concat(results, how="diagonal_relaxed")
+    batches: list[list[dict]] = [
+        property_urls[i : i + batch_size]
+        for i in range(0, len(property_urls), batch_size)
+    ]
+
+    if engine == "async":
+        futures: list[PrefectFuture] = listing_batch_collection.map(
+            batches, unmapped(csrf_token), unmapped(concurrency)
+        )
+
+        df: pl.DataFrame = pl.concat(
+            [
+                pl.DataFrame(schema=PROPERTY_SCHEMA),
+                *(future.result() for future in futures),
+            ],
+            how="vertical",
+        )
+    elif engine == "fused":
+        futures = listing_fused_collection.map(batches, unmapped(csrf_token))
+
+        df = pl.concat(
+            [
+                pl.DataFrame(schema=PROPERTY_SCHEMA),
+                *(future.result() for future in futures),
+            ],
+            how="vertical",
+        )
+    elif engine == "tasks":
+        batch_get = AdaptiveBatchTask(listing_collection, 60)
+
+        futures = batch_get.map(property_urls, unmapped(csrf_token))
+
+        results: list[dict] = [future.result() for future in futures]
+
+        df = property_jsons_to_df(results)
+    else:
+        raise ValueError(f"Unknown listing engine {engine}")
 
     return df
@@ -6,11 +6,20 @@ import pendulum
 import polars as pl
 from prefect import flow, task, unmapped
 from prefect.futures import PrefectFuture
-from prefecto.concurrency import BatchTask
+from prefecto.logging import get_prefect_or_default_logger
 
+from zillow.adaptive import AdaptiveBatchTask
 from zillow.mongo_models.query_config import RegionConfig
-from zillow.query import parse_max_pages, parse_result_content, query_search
+from zillow.query import (
+    PAGE_CAP,
+    exceeds_page_cap,
+    parse_max_pages,
+    parse_result_content,
+    query_search,
+)
+from zillow.sink import write_partitions
 from zillow.sitemap import extract_csrf_token
+from zillow.spool import SpoolHandle, spool
 
 
 @task(name="Extract and Transform")
@@ -23,9 +32,13 @@ def extract_and_transform(page_num, csrf_token, region_config) -> pl.DataFrame:
         region_config: Static attributes for a region
 
     """
-    r_json: dict = query_search.submit(csrf_token, region_config, page_num).result()
+    handle: SpoolHandle = query_search.submit(
+        csrf_token, region_config, page_num, spooled=True
+    ).result()
+
+    price_results: pl.DataFrame = parse_result_content.submit(handle).result()
 
-    price_results: pl.DataFrame = parse_result_content.submit(r_json).result()
+    spool.discard(handle)
 
     return price_results
 
@@ -33,26 +46,28 @@ def extract_and_transform(page_num, csrf_token, region_config) -> pl.DataFrame:
 @flow(
     name="Query Zillow Regions", description="Requests a Search from defined boundaries"
 )
-def query_zillow_regions(region_config: RegionConfig) -> pl.DataFrame:
+def query_zillow_regions(
+    region_config: RegionConfig, output: str | None = None
+) -> pl.DataFrame:
     """
     Requests a Search from defined boundaries
 
-    # TODO: Dump df into object store
-
     Args:
 
         region_config: Static attributes for a region
-        recently_modified: Recently modified results from sitemap
+        output: Directory or ``s3-bucket/<block name>`` the results are appended to
 
     """
 
     csrf_token = extract_csrf_token()
 
-    first_page: dict = query_search(csrf_token, region_config)
+    first_page: SpoolHandle = query_search(csrf_token, region_config, spooled=True)
 
     pages: list[int] = parse_max_pages(first_page)
 
-    batch_get = BatchTask(extract_and_transform, 10)
+    spool.discard(first_page)
+
+    batch_get = AdaptiveBatchTask(extract_and_transform, 10)
 
     futures: list[PrefectFuture] = batch_get.map(
         pages, unmapped(csrf_token), unmapped(region_config)
@@ -61,7 +76,151 @@ def query_zillow_regions(region_config: RegionConfig) -> pl.DataFrame:
     results: list = [future.result() for future in futures]
 
     df: pl.DataFrame = (
-        pl.concat(results, how="vertical")
+        pl.concat(results, how="vertical", rechunk=False)
+        .with_columns(
+            region=pl.lit(region_config.usersSearchTerm),
+            as_of_date=pl.lit(pendulum.today().date()),
+        )
+        .cast({"zpid": pl.String})
+    )
+
+    if output is not None:
+        write_partitions(df, "pricing", output)
+
+    return df
+
+
+def tile_regions(
+    csrf_token: str,
+    region_configs: list[RegionConfig],
+    page_cap: int | None = PAGE_CAP,
+    max_depth: int = 4,
+) -> list[tuple[RegionConfig, SpoolHandle]]:
+    """
+    Requests the first page of every region and splits regions with more results
+    than the page cap into quadrants until each tile fits, one level at a time so
+    every tile of a level is requested concurrently
+
+    Args:
+        csrf_token: Token for use across each worker node
+        region_configs: Static attributes for each region
+        page_cap: Maximum pages zillow serves per search, regions are not split if
+            None
+        max_depth: Maximum number of times a region is split
+
+    Returns:
+        tiles: Region config of each tile and a handle to its first page
+    """
+    logger = get_prefect_or_default_logger()
+
+    tiles: list[tuple[RegionConfig, SpoolHandle]] = []
+    level: list[RegionConfig] = list(region_configs)
+
+    for depth in range(max_depth + 1):
+        if not level:
+            break
+
+        first_pages: list[SpoolHandle] = [
+            future.result()
+            for future in query_search.map(
+                unmapped(csrf_token), level, spooled=unmapped(True)
+            )
+        ]
+
+        next_level: list[RegionConfig] = []
+        for region_config, first_page in zip(level, first_pages):
+            if page_cap is None or not exceeds_page_cap(first_page, page_cap):
+                tiles.append((region_config, first_page))
+            elif depth < max_depth:
+                next_level.extend(
+                    region_config.with_bounds(bounds)
+                    for bounds in region_config.mapBounds.quadrants()
+                )
+                spool.discard(first_page)
+            else:
+                total: int = first_page.read_json()["cat1"]["searchList"].get(
+                    "totalResultCount"
+                )
+                logger.warning(
+                    f"Tile {region_config.mapBounds.model_dump()} of "
+                    f"{region_config.usersSearchTerm} still has {total} results past "
+                    f"the {page_cap} page cap at max depth {max_depth}, results past "
+                    "its last page are lost"
+                )
+                tiles.append((region_config, first_page))
+
+        level = next_level
+
+    return tiles
+
+
+@flow(
+    name="Query Zillow Region Set",
+    description="Paginates every region concurrently under one request budget",
+)
+def query_zillow_region_set(
+    region_configs: list[RegionConfig],
+    batch_size: int = 10,
+    page_cap: int | None = PAGE_CAP,
+    max_depth: int = 4,
+) -> pl.DataFrame:
+    """
+    Schedules the pages of every region as one workload. Regions too large for the
+    page cap are tiled, tiles are ordered by page count so the largest start first,
+    and every remaining (tile, page) pair is mapped under the shared search budget.
+
+    Args:
+        region_configs: Static attributes for each region
+        batch_size: Pages mapped per batch at full concurrency
+        page_cap: Maximum pages zillow serves per search, regions are not tiled if
+            None
+        max_depth: Maximum number of times a region is split
+
+    Returns:
+        df: Results of every region, unique by ``zpid`` within a region, with a
+            ``region`` column naming the region
+    """
+    csrf_token = extract_csrf_token()
+
+    tiles: list[tuple[RegionConfig, SpoolHandle, list[int]]] = sorted(
+        (
+            (region_config, first_page, parse_max_pages.fn(first_page))
+            for region_config, first_page in tile_regions(
+                csrf_token, region_configs, page_cap, max_depth
+            )
+        ),
+        key=lambda tile: len(tile[2]),
+        reverse=True,
+    )
+
+    pairs: list[tuple[RegionConfig, int]] = [
+        (region_config, page) for region_config, _, pages in tiles for page in pages
+    ]
+
+    batch_get = AdaptiveBatchTask(extract_and_transform, batch_size)
+
+    futures: list[PrefectFuture] = batch_get.map(
+        [page for _, page in pairs],
+        unmapped(csrf_token),
+        [region_config for region_config, _ in pairs],
+    )
+
+    results: list[pl.DataFrame] = [
+        parse_result_content.fn(first_page).with_columns(
+            region=pl.lit(region_config.usersSearchTerm)
+        )
+        for region_config, first_page, _ in tiles
+    ]
+    for _, first_page, _ in tiles:
+        spool.discard(first_page)
+    results.extend(
+        future.result().with_columns(region=pl.lit(region_config.usersSearchTerm))
+        for future, (region_config, _) in zip(futures, pairs)
+    )
+
+    df: pl.DataFrame = (
+        pl.concat(results, how="vertical", rechunk=False)
+        .unique(subset=["region", "zpid"], keep="first", maintain_order=True)
         .with_columns(as_of_date=pl.lit(pendulum.today().date()))
         .cast({"zpid": pl.String})
     )
@@ -2,67 +2,113 @@
 Utility Functions
 """
 
-import random
-import time
-from typing import Callable
+from typing import Callable, Iterator
 
 import polars as pl
 from prefect import task
 from prefect.client.schemas import State, TaskRun
 from prefect.context import get_run_context
 from prefect.futures import PrefectFuture
-from prefecto.concurrency import BatchTask
 from prefecto.logging import get_prefect_or_default_logger
 
+from zillow.adaptive import AdaptiveBatchTask
 from zillow.blocks import blocks
-from zillow.mongo_models.sitemap_model import Property, PropertySet, ZillowRepository
-from zillow.sitemap import extract_csrf_token
+from zillow.csrf import csrf_tokens
+from zillow.ids import timestamp_expr
+from zillow.mongo_models.sitemap_model import (
+    Property,
+    UpsertCounts,
+    ZillowRepository,
+)
+
+
+def iter_recently_modified(
+    repo: ZillowRepository, sitemap_df: pl.DataFrame, chunk_size: int = 1000
+) -> Iterator[pl.DataFrame]:
+    """
+    Diffs sitemap records against the stored documents one chunk at a time
+
+    Args:
+        repo: Repository of the stored properties
+        sitemap_df: Sitemap records with property_url, last_modified and zillow_id
+        chunk_size: Records looked up per query
+
+    Returns:
+        chunks: New or modified records of each chunk
+    """
+    for chunk in sitemap_df.iter_slices(chunk_size):
+        current_df: pl.DataFrame = repo.find_last_modified(
+            chunk.get_column("zillow_id").to_list()
+        ).rename({"last_modified": "last_modified_current"})
+
+        yield (
+            chunk.join(current_df, on="zillow_id", how="left")
+            .filter(
+                (
+                    timestamp_expr(pl.col("last_modified"))
+                    > timestamp_expr(pl.col("last_modified_current"))
+                )
+                | (pl.col("last_modified_current").is_null())
+            )
+            .drop("last_modified_current")
+        )
 
 
 @task(description="Checks against the MongoDB for newly modified Urls")
-def return_recently_modified(sitemap_results: list[Property]) -> pl.DataFrame:
-    """ """
+def return_recently_modified(
+    sitemap_results: list[Property], chunk_size: int = 1000
+) -> pl.DataFrame:
+    """
+    Keeps the sitemap records that are new or modified since they were stored
+
+    Args:
+        sitemap_results: Sitemap records
+        chunk_size: Records looked up per indexed query
 
+    Returns:
+        df: New or modified records
+    """
     repo = ZillowRepository((blocks.mongodb).get_client()["production"])
+    repo.ensure_indexes()
 
-    current_props: PropertySet = repo.get_all()
+    sitemap_df: pl.DataFrame = pl.from_dicts(sitemap_results).drop("id")
 
-    if current_props:
-        current_props = current_props.model_dump()
+    return pl.concat(
+        [sitemap_df.clear(), *iter_recently_modified(repo, sitemap_df, chunk_size)],
+        how="vertical",
+    )
 
-        current_df: pl.DataFrame = pl.from_dicts(current_props).drop("id")
 
-    else:
-        current_df = pl.DataFrame(
-            schema={
-                "property_url": pl.String,
-                "last_modified": pl.String,
-                "zillow_id": pl.String,
-            }
-        )
+@task(description="Persists new and modified sitemap records to MongoDB")
+def upsert_properties(records: list[dict], batch_size: int = 1000) -> UpsertCounts:
+    """
+    Writes the sitemap records of a run back so the next diff skips them
 
-    sitemap_df: pl.DataFrame = pl.from_dicts(sitemap_results).drop("id")
+    Args:
+        records: Sitemap records with property_url, last_modified and zillow_id
+        batch_size: Documents written per round trip
 
-    df = (
-        sitemap_df.join(
-            current_df, on=["property_url", "zillow_id"], how="left", suffix="_current"
-        )
-        .filter(
-            (
-                pl.col("last_modified").cast(pl.Datetime)
-                > pl.col("last_modified_current").cast(pl.Datetime)
-            )
-            | (pl.col("last_modified_current").is_null())
-        )
-        .drop("last_modified_current")
+    Returns:
+        counts: Inserted, updated and unchanged documents
+    """
+    logger = get_prefect_or_default_logger()
+
+    repo = ZillowRepository((blocks.mongodb).get_client()["production"])
+    repo.ensure_indexes()
+
+    counts: UpsertCounts = repo.upsert_many(records, batch_size)
+
+    logger.info(
+        f"Upserted properties: {counts.inserted} inserted, {counts.updated} updated, "
+        f"{counts.unchanged} unchanged"
     )
 
-    return df
+    return counts
 
 
 def modify_param_on_retry(csrf_token):
     """
-    Upon retry a new csrf token will be retrieved
+    Upon retry the csrf token is replaced, concurrent retries share one refresh
     """
     # Get the current Prefect context
 
@@ -75,12 +121,9 @@ def modify_param_on_retry(csrf_token):
 
     if retry_count > 0:
         logger.info(f"Retry attempt {retry_count}: modifying creating new csrf token")
-        csrf_token = extract_csrf_token()
+        csrf_token = csrf_tokens.refresh(stale=csrf_token)
         return csrf_token
     else:
-        sleep_time: int = random.randint(30, 70)
-        time.sleep(sleep_time)
-
         return csrf_token
 
 
@@ -100,7 +143,7 @@ def batch_task_results(func: Callable, objects: list, size: int | None = None) -
     if not size:
         size = 10
 
-    batch_get = BatchTask(func, size)
+    batch_get = AdaptiveBatchTask(func, size)
 
     futures: list[PrefectFuture] = batch_get.map(objects)
 
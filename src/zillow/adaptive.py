@@ -0,0 +1,254 @@
+"""
+Module for adapting request pressure to how Zillow is responding. An AIMD controller
+watches status codes and latency of every request and grows or shrinks concurrency
+and the delay between requests, which batch sizes, the listing engine and search
+pagination all consult.
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+from prefect import unmapped
+from prefect.futures import PrefectFuture
+from prefect.tasks import Task
+from prefect.utilities.callables import get_call_parameters
+from prefecto import states
+from prefecto.concurrency import BatchTask
+from prefecto.logging import get_prefect_or_default_logger
+
+# Statuses Zillow answers throttled or stale-token requests with, backing off and
+# refreshing the token on them is shared by every fetch path
+THROTTLE_STATUS_CODES: frozenset[int] = frozenset({403, 429})
+SENT_AT: str = "zillow_sent_at"
+
+
+class AdaptiveController:
+    """
+    Additive increase, multiplicative decrease controller. Every ``window``
+    successful responses add one to concurrency and shrink the delay; a throttled
+    (403/429), failed (5xx) or slow response halves concurrency and doubles the
+    delay, at most once per ``cooldown`` seconds so one burst of errors is a single
+    signal.
+
+    Args:
+        min_concurrency: Lower bound on concurrency
+        max_concurrency: Upper bound on concurrency, also the starting point
+        min_delay: Lower bound in seconds on the delay between requests
+        max_delay: Upper bound in seconds on the delay between requests
+        latency_target: Responses slower than this many seconds count as pressure
+        window: Successful responses needed per additive increase
+        cooldown: Minimum seconds between multiplicative decreases
+    """
+
+    def __init__(
+        self,
+        min_concurrency: int = 1,
+        max_concurrency: int = 60,
+        min_delay: float = 0,
+        max_delay: float = 120,
+        latency_target: float = 10,
+        window: int = 20,
+        cooldown: float = 5,
+    ):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latency_target = latency_target
+        self.window = window
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Returns to full concurrency and the minimum delay
+        """
+        with self._lock:
+            self._concurrency: float = self.max_concurrency
+            self._delay: float = self.min_delay
+            self._successes: int = 0
+            self._last_decrease: float = float("-inf")
+
+    @property
+    def concurrency(self) -> int:
+        """
+        Current number of requests that may be in flight
+        """
+        return int(self._concurrency)
+
+    @property
+    def delay(self) -> float:
+        """
+        Current delay in seconds before each request
+        """
+        return self._delay
+
+    def batch_size(self, base: int) -> int:
+        """
+        Scales a batch size by the current share of maximum concurrency
+        """
+        return max(1, round(base * self._concurrency / self.max_concurrency))
+
+    def record(self, status_code: int, latency: float):
+        """
+        Records the outcome of a request
+
+        Args:
+            status_code: HTTP status of the response
+            latency: Seconds until the response headers arrived
+        """
+        pressured: bool = (
+            status_code in THROTTLE_STATUS_CODES
+            or status_code >= 500
+            or latency > self.latency_target
+        )
+
+        with self._lock:
+            if pressured:
+                self._decrease()
+            else:
+                self._successes += 1
+                if self._successes >= self.window:
+                    self._increase()
+
+    def _increase(self):
+        """
+        Additive increase, caller holds the lock
+        """
+        self._successes = 0
+        self._concurrency = min(self.max_concurrency, self._concurrency + 1)
+        halved: float = self._delay / 2
+        self._delay = max(self.min_delay, halved if halved >= 1 else 0)
+
+    def _decrease(self):
+        """
+        Multiplicative decrease, caller holds the lock
+        """
+        self._successes = 0
+        now: float = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+
+        self._last_decrease = now
+        self._concurrency = max(self.min_concurrency, self._concurrency / 2)
+        self._delay = min(self.max_delay, max(1, self._delay * 2))
+
+        logger = get_prefect_or_default_logger()
+        logger.info(
+            f"Backing off to concurrency {self.concurrency}, delay {self._delay:.1f}s"
+        )
+
+    def pause(self):
+        """
+        Sleeps for the current delay
+        """
+        if self._delay:
+            time.sleep(self._delay)
+
+    async def pause_async(self):
+        """
+        Sleeps for the current delay without blocking the event loop
+        """
+        if self._delay:
+            await asyncio.sleep(self._delay)
+
+    def _on_request(self, request: httpx.Request):
+        """
+        Stamps the request with the time it was sent
+        """
+        request.extensions[SENT_AT] = time.monotonic()
+
+    def _on_response(self, response: httpx.Response):
+        """
+        Records the response status and time to headers
+        """
+        sent_at: float = response.request.extensions.get(SENT_AT, time.monotonic())
+        self.record(response.status_code, time.monotonic() - sent_at)
+
+    async def _on_request_async(self, request: httpx.Request):
+        """
+        Async client form of _on_request
+        """
+        self._on_request(request)
+
+    async def _on_response_async(self, response: httpx.Response):
+        """
+        Async client form of _on_response
+        """
+        self._on_response(response)
+
+    def event_hooks(self, asynchronous: bool = False) -> dict:
+        """
+        httpx event hooks feeding every response to the controller
+
+        Args:
+            asynchronous: Hooks for an ``httpx.AsyncClient``
+        """
+        if asynchronous:
+            return {
+                "request": [self._on_request_async],
+                "response": [self._on_response_async],
+            }
+
+        return {"request": [self._on_request], "response": [self._on_response]}
+
+
+controller = AdaptiveController()
+
+
+class AdaptiveBatchTask(BatchTask):
+    """
+    BatchTask whose batch size follows the controller. The size is recomputed
+    before every batch is mapped, so a throttled run submits smaller batches.
+
+    Args:
+        task: The task to wrap
+        size: Batch size at full concurrency
+        adaptive: Controller the batch size follows
+    """
+
+    def __init__(
+        self,
+        task: Task,
+        size: int,
+        adaptive: AdaptiveController = controller,
+        **kwargs,
+    ):
+        super().__init__(task, size, **kwargs)
+        self.base_size = size
+        self.adaptive = adaptive
+
+    def map(self, *args, **kwds) -> list[PrefectFuture]:
+        """
+        Maps the task batch by batch, resizing each batch from the controller
+        """
+        remaining: dict = get_call_parameters(
+            self.task.fn, args, kwds, apply_defaults=False
+        )
+        results: list[PrefectFuture] = []
+
+        while True:
+            self.size = self.adaptive.batch_size(self.base_size)
+            batches: list[dict] = self._make_batches(**remaining)
+            if not batches:
+                return results
+
+            futures: list[PrefectFuture] = self.task.map(**batches[0])
+            results.extend(futures)
+            if len(batches) == 1:
+                return results
+
+            while not all(states.is_terminal(f.get_state()) for f in futures):
+                time.sleep(0.1)
+
+            if self._kill_switch is not None:
+                for future in futures:
+                    self._kill_switch.raise_if_triggered(future.get_state())
+
+            remaining = {
+                key: value if isinstance(value, unmapped) else value[self.size :]
+                for key, value in remaining.items()
+            }
@@ -0,0 +1,303 @@
+"""
+Module caching raw Zillow responses so reruns and reprocessing skip the network.
+Entries are addressed by a hash of the request, grouped into one directory per day,
+compressed, expired after a TTL and evicted least recently used past a size bound.
+An S3 bucket can back the local cache so other workers reuse the responses.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from math import ceil
+from pathlib import Path
+
+import orjson
+from botocore.exceptions import ClientError
+from prefect.blocks.core import Block
+from prefect_aws import S3Bucket
+
+DAY_SECONDS: int = 24 * 60 * 60
+CONTEXT_SUFFIX: str = ".meta"
+
+
+def cache_key(url: str, payload: dict | None = None) -> str:
+    """
+    Content address of a request
+
+    Args:
+        url: Requested URL
+        payload: JSON body of the request
+
+    Returns:
+        key: Hex sha256 of the URL and payload
+    """
+    digest = hashlib.sha256(url.encode())
+
+    if payload is not None:
+        digest.update(orjson.dumps(payload, default=str, option=orjson.OPT_SORT_KEYS))
+
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Compressed on disk response cache, disabled until a root is configured
+
+    Args:
+        root: Local directory of the cache, the cache is disabled if None
+        bucket: S3 bucket block consulted after the local cache misses
+        ttl: Seconds an entry is served for
+        max_bytes: Size bound of the local cache
+        compression_level: zlib compression level
+    """
+
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        bucket: S3Bucket | None = None,
+        ttl: float = DAY_SECONDS,
+        max_bytes: int = 2 * 1024**3,
+        compression_level: int = 6,
+    ):
+        self._lock = threading.Lock()
+        self.root = Path(root) if root is not None else None
+        self.bucket = bucket
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._size: int | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether responses are cached
+        """
+        return self.root is not None
+
+    def configure(self, root: str | Path | None = None, bucket: S3Bucket | None = None):
+        """
+        Points the cache at a directory and optional bucket, disabling it if root is
+        None
+        """
+        with self._lock:
+            self.root = Path(root) if root is not None else None
+            self.bucket = bucket
+            self._size = None
+
+    def use(self, location: str | None, root: str | Path = "cache"):
+        """
+        Configures the cache from a flow parameter
+
+        Args:
+            location: Directory path, or ``s3-bucket/<block name>`` to back a local
+                cache at ``root`` with S3. Disables the cache if None
+            root: Local directory used with an S3 location
+        """
+        if location is None:
+            self.configure(None)
+        elif location.startswith("s3-bucket/"):
+            self.configure(root, Block.load(location))
+        else:
+            self.configure(location)
+
+    def _partitions(self) -> list[str]:
+        """
+        Date partitions that may hold unexpired entries, newest first
+        """
+        today = datetime.now(timezone.utc).date()
+
+        return [
+            (today - timedelta(days=days)).isoformat()
+            for days in range(ceil(self.ttl / DAY_SECONDS) + 1)
+        ]
+
+    @staticmethod
+    def _relative(partition: str, key: str) -> str:
+        """
+        Path of an entry relative to the cache root
+        """
+        return f"{partition}/{key[:2]}/{key}.z"
+
+    @staticmethod
+    def _context_relative(relative: str) -> str:
+        """
+        Path of the request context stored beside an entry
+        """
+        return relative.removesuffix(".z") + CONTEXT_SUFFIX
+
+    def get(self, url: str, payload: dict | None = None) -> bytes | None:
+        """
+        Returns a cached response body
+
+        Args:
+            url: Requested URL
+            payload: JSON body of the request
+
+        Returns:
+            content: Response body, None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        key: str = cache_key(url, payload)
+        now: float = time.time()
+
+        for partition in self._partitions():
+            path: Path = self.root / self._relative(partition, key)
+            try:
+                stat: os.stat_result = path.stat()
+            except FileNotFoundError:
+                continue
+
+            if now - stat.st_mtime > self.ttl:
+                continue
+
+            # mtime keeps the write time for the TTL, atime tracks the last hit
+            os.utime(path, (now, stat.st_mtime))
+            return zlib.decompress(path.read_bytes())
+
+        if self.bucket is not None:
+            return self._get_remote(key)
+
+        return None
+
+    def _get_remote(self, key: str) -> bytes | None:
+        """
+        Reads an unexpired entry from the bucket into the local cache, keeping its
+        upload time as the write time for the TTL
+        """
+        client = self.bucket.credentials.get_s3_client()
+        now: float = time.time()
+
+        for partition in self._partitions():
+            relative: str = self._relative(partition, key)
+            try:
+                response: dict = client.get_object(
+                    Bucket=self.bucket.bucket_name, Key=self._remote_key(relative)
+                )
+            except ClientError:
+                continue
+
+            written_at: float = response["LastModified"].timestamp()
+            if now - written_at > self.ttl:
+                continue
+
+            compressed: bytes = response["Body"].read()
+            self._write_local(relative, compressed, written_at)
+            return zlib.decompress(compressed)
+
+        return None
+
+    def _remote_key(self, relative: str) -> str:
+        """
+        Key of an entry in the bucket, below its folder
+        """
+        folder: str = self.bucket.bucket_folder.strip("/")
+        return f"{folder}/{relative}" if folder else relative
+
+    def put(self, url: str, content: bytes, payload: dict | None = None):
+        """
+        Caches a response body with the request that produced it, so replays can
+        recover the request context such as the searched region
+
+        Args:
+            url: Requested URL
+            content: Response body
+            payload: JSON body of the request
+        """
+        if not self.enabled:
+            return
+
+        relative: str = self._relative(self._partitions()[0], cache_key(url, payload))
+        compressed: bytes = zlib.compress(content, self.compression_level)
+        context: bytes = orjson.dumps({"url": url, "payload": payload}, default=str)
+
+        self._write_file(self._context_relative(relative), context)
+        self._write_local(relative, compressed)
+
+        if self.bucket is not None:
+            self.bucket.write_path(self._context_relative(relative), context)
+            self.bucket.write_path(relative, compressed)
+
+    def _write_file(self, relative: str, content: bytes):
+        """
+        Atomically writes a file below the cache root
+        """
+        path: Path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        temporary: Path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        temporary.write_bytes(content)
+        os.replace(temporary, path)
+
+    def _write_local(
+        self, relative: str, compressed: bytes, written_at: float | None = None
+    ):
+        """
+        Atomically writes an entry and evicts past the size bound
+
+        Args:
+            relative: Path of the entry relative to the cache root
+            compressed: Compressed response body
+            written_at: Write time used for the TTL, now if None
+        """
+        path: Path = self.root / relative
+        try:
+            replaced: int = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+
+        self._write_file(relative, compressed)
+
+        if written_at is not None:
+            os.utime(path, (time.time(), written_at))
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry.stat().st_size for entry in self._entries())
+            else:
+                self._size += len(compressed) - replaced
+
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list[Path]:
+        """
+        Every entry of the local cache
+        """
+        return list(self.root.glob("*/*/*.z"))
+
+    def _evict(self):
+        """
+        Removes expired entries, then least recently used ones until the cache is
+        below 90% of its bound, caller holds the lock
+        """
+        now: float = time.time()
+        entries: list[tuple[bool, float, int, Path]] = []
+
+        for path in self._entries():
+            try:
+                stat: os.stat_result = path.stat()
+            except FileNotFoundError:
+                continue
+            fresh: bool = now - stat.st_mtime <= self.ttl
+            entries.append((fresh, stat.st_atime, stat.st_size, path))
+
+        size: int = sum(entry[2] for entry in entries)
+        target: float = self.max_bytes * 0.9
+
+        # Expired entries first, then least recently used
+        for fresh, _, entry_size, path in sorted(entries):
+            if fresh and size <= target:
+                break
+            path.unlink(missing_ok=True)
+            path.with_suffix(CONTEXT_SUFFIX).unlink(missing_ok=True)
+            size -= entry_size
+
+        self._size = size
+
+
+response_cache = ResponseCache()
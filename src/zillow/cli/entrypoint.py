@@ -11,3 +11,39 @@ def cli():
     entrypoint for command group
     """
     ...
+
+
+@cli.command()
+@click.argument("source")
+@click.argument("output")
+@click.option("--workers", type=int, default=None, help="Worker processes")
+@click.option("--chunk-size", type=int, default=200, help="Responses per worker task")
+def replay(source: str, output: str, workers: int | None, chunk_size: int):
+    """
+    Replays archived responses in SOURCE through the transforms into OUTPUT.
+    Both are directories or ``s3-bucket/<block name>`` slugs
+    """
+    from zillow.replay import ReplayCounts, replay_location
+
+    counts: ReplayCounts = replay_location(source, output, workers, chunk_size)
+
+    click.echo(counts.model_dump_json())
+
+
+@cli.command()
+def migrate_indexes():
+    """
+    Replaces the non-unique zillow_id index of the production collection with the
+    unique one, failing while zillow ids are duplicated
+    """
+    from zillow.blocks import blocks
+    from zillow.mongo_models.sitemap_model import ZillowRepository
+
+    repo = ZillowRepository((blocks.mongodb).get_client()["production"])
+
+    try:
+        repo.migrate_indexes()
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    click.echo("Unique zillow_id index in place")
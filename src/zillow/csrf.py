@@ -0,0 +1,258 @@
+"""
+Module providing the CSRF token shared by every Zillow request. Tokens are cached
+with a TTL and refreshed ahead of expiry, only one refresh runs at a time, and
+workers can share a token through MongoDB instead of each fetching their own.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+import httpx
+from fake_useragent import UserAgent
+from prefecto.logging import get_prefect_or_default_logger
+from pymongo.collection import Collection
+
+from zillow.http import get_client
+
+CSRF_URL: str = "https://www.zillow.com/xml/indexes/us/hdp/for-sale-by-agent.xml.gz"
+CSRF_HEADER: str = "x-amz-cf-id"
+
+
+def fetch_csrf_token() -> str:
+    """
+    Requests a new csrf token from the site without downloading the index. Uses a
+    HEAD request and falls back to a single byte range GET when HEAD is refused or
+    the header is missing.
+
+    Returns:
+        csrf_token
+    """
+    headers = {"User-Agent": UserAgent().random}
+    client: httpx.Client = get_client()
+
+    response: httpx.Response = client.head(CSRF_URL, headers=headers)
+
+    if response.is_success and CSRF_HEADER in response.headers:
+        return response.headers[CSRF_HEADER]
+
+    headers["Range"] = "bytes=0-0"
+
+    # Streamed so a server ignoring the range does not send the body
+    with client.stream("GET", CSRF_URL, headers=headers) as response:
+        response.raise_for_status()
+
+        return response.headers[CSRF_HEADER]
+
+
+def fetch_csrf_token_with_body() -> tuple[str | None, bytes]:
+    """
+    Downloads the sitemap index and reads the csrf token from the same response
+
+    Returns:
+        csrf_token: Token, None if the response did not carry one
+        content: Sitemap index body
+    """
+    headers = {"User-Agent": UserAgent().random}
+
+    response: httpx.Response = get_client().get(CSRF_URL, headers=headers)
+
+    response.raise_for_status()
+
+    return response.headers.get(CSRF_HEADER), response.content
+
+
+class MongoTokenStore:
+    """
+    Shares the current token between workers
+
+    Args:
+        collection: Collection holding the token document
+        key: Document id of the token
+    """
+
+    def __init__(self, collection: Collection, key: str = "csrf"):
+        self.collection = collection
+        self.key = key
+
+    def get(self) -> tuple[str, float] | None:
+        """
+        Returns the shared token and the epoch seconds it was fetched at
+        """
+        document: dict | None = self.collection.find_one({"_id": self.key})
+        if document is None:
+            return None
+
+        fetched_at: datetime = document["fetched_at"]
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+
+        return document["token"], fetched_at.timestamp()
+
+    def put(self, token: str, fetched_at: float):
+        """
+        Replaces the shared token
+        """
+        self.collection.update_one(
+            {"_id": self.key},
+            {
+                "$set": {
+                    "token": token,
+                    "fetched_at": datetime.fromtimestamp(fetched_at, timezone.utc),
+                }
+            },
+            upsert=True,
+        )
+
+
+class CsrfTokenProvider:
+    """
+    Caches a csrf token. Tokens older than ``ttl`` are refetched before they are
+    returned, tokens within ``refresh_ahead`` seconds of expiry are still returned
+    while one background refresh replaces them.
+
+    Args:
+        fetch: Callable requesting a new token
+        ttl: Seconds a token is used for
+        refresh_ahead: Seconds before expiry a background refresh starts
+        store: Shared store consulted before fetching, local only if None
+        clock: Epoch seconds clock
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], str] = fetch_csrf_token,
+        ttl: float = 30 * 60,
+        refresh_ahead: float = 5 * 60,
+        store: MongoTokenStore | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.store = store
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._token: str | None = None
+        self._fetched_at: float = float("-inf")
+        self._refreshing: bool = False
+
+    def use_store(self, store: MongoTokenStore | None):
+        """
+        Switches between the shared store and a local only cache
+        """
+        self.store = store
+
+    def clear(self):
+        """
+        Drops the cached token
+        """
+        with self._lock:
+            self._token = None
+            self._fetched_at = float("-inf")
+
+    def _age(self) -> float:
+        """
+        Seconds since the cached token was fetched
+        """
+        return self.clock() - self._fetched_at
+
+    def _load(self):
+        """
+        Replaces the cached token with the shared one when it is newer, caller
+        holds the lock
+        """
+        if self.store is None:
+            return
+
+        shared: tuple[str, float] | None = self.store.get()
+        if shared is not None and shared[1] > self._fetched_at:
+            self._token, self._fetched_at = shared
+
+    def _refresh(self):
+        """
+        Fetches and publishes a new token, caller holds the lock
+        """
+        token: str = self.fetch()
+        self._token, self._fetched_at = token, self.clock()
+
+        if self.store is not None:
+            self.store.put(token, self._fetched_at)
+
+    def _refresh_in_background(self):
+        """
+        Refreshes the token for later callers, errors keep the current token. The
+        fetch runs outside the lock so callers keep getting the current token
+        """
+        try:
+            token: str = self.fetch()
+            fetched_at: float = self.clock()
+
+            with self._lock:
+                if fetched_at > self._fetched_at:
+                    self._token, self._fetched_at = token, fetched_at
+
+                    if self.store is not None:
+                        self.store.put(token, fetched_at)
+        except Exception as error:
+            logger = get_prefect_or_default_logger()
+            logger.warning(f"Background csrf token refresh failed: {error}")
+        finally:
+            self._refreshing = False
+
+    def get(self) -> str:
+        """
+        Returns a token that has not expired, fetching one if needed
+
+        Returns:
+            csrf_token
+        """
+        if self._token is not None and self._age() < self.ttl - self.refresh_ahead:
+            return self._token
+
+        with self._lock:
+            if self._token is None or self._age() >= self.ttl - self.refresh_ahead:
+                self._load()
+
+            if self._token is None or self._age() >= self.ttl:
+                self._refresh()
+            elif self._age() >= self.ttl - self.refresh_ahead and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(
+                    target=self._refresh_in_background, daemon=True
+                ).start()
+
+            return self._token
+
+    def seed(self, token: str):
+        """
+        Caches a token read from another response
+        """
+        with self._lock:
+            self._token, self._fetched_at = token, self.clock()
+
+            if self.store is not None:
+                self.store.put(token, self._fetched_at)
+
+    def refresh(self, stale: str | None = None) -> str:
+        """
+        Replaces a token the site rejected. Concurrent callers holding the same
+        stale token share one fetch.
+
+        Args:
+            stale: Token that failed, the current token is replaced if None
+
+        Returns:
+            csrf_token
+        """
+        with self._lock:
+            self._load()
+
+            if self._token is None or stale is None or self._token == stale:
+                self._refresh()
+
+            return self._token
+
+
+csrf_tokens = CsrfTokenProvider()
@@ -0,0 +1,144 @@
+"""
+Module managing the pooled HTTP clients shared by every Zillow request in a worker
+"""
+
+import atexit
+import os
+import threading
+
+import httpx
+from prefecto.logging import get_prefect_or_default_logger
+
+from zillow.adaptive import AdaptiveController, controller
+
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=30
+)
+DEFAULT_TIMEOUT = httpx.Timeout(120, connect=10)
+
+
+def http2_available() -> bool:
+    """
+    HTTP/2 needs the optional ``h2`` package
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+class ClientManager:
+    """
+    Lazily creates one pooled, keep-alive ``httpx.Client`` per process and hands out
+    async clients with the same settings. Clients are recreated after a fork so
+    process pools never share sockets with their parent. Every response is reported
+    to the adaptive controller.
+    """
+
+    def __init__(
+        self,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        http2: bool = False,
+        adaptive: AdaptiveController | None = controller,
+    ):
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+        self._pid: int | None = None
+        self.limits = limits
+        self.timeout = timeout
+        self.http2 = http2
+        self.adaptive = adaptive
+
+    def configure(
+        self,
+        limits: httpx.Limits | None = None,
+        timeout: httpx.Timeout | None = None,
+        http2: bool | None = None,
+    ):
+        """
+        Updates the client settings, closing the current client so the next request
+        picks them up
+
+        Args:
+            limits: Connection pool limits
+            timeout: Request timeouts
+            http2: Negotiate HTTP/2 when the ``h2`` package is installed
+        """
+        with self._lock:
+            self.limits = limits or self.limits
+            self.timeout = timeout or self.timeout
+            self.http2 = self.http2 if http2 is None else http2
+            self._close()
+
+    def client_kwargs(self, asynchronous: bool = False) -> dict:
+        """
+        Keyword arguments shared by the sync and async clients
+        """
+        http2: bool = self.http2
+        if http2 and not http2_available():
+            logger = get_prefect_or_default_logger()
+            logger.warning("h2 is not installed, falling back to HTTP/1.1")
+            http2 = False
+
+        kwargs: dict = {"limits": self.limits, "timeout": self.timeout, "http2": http2}
+
+        if self.adaptive is not None:
+            kwargs["event_hooks"] = self.adaptive.event_hooks(asynchronous)
+
+        return kwargs
+
+    def get_client(self) -> httpx.Client:
+        """
+        Returns the process wide pooled client, creating it if needed
+        """
+        with self._lock:
+            if self._client is None or self._client.is_closed or self._forked():
+                self._client = httpx.Client(**self.client_kwargs())
+                self._pid = os.getpid()
+
+            return self._client
+
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Creates an async client with the shared settings. Async clients are bound to
+        an event loop, so the caller owns and closes it
+        """
+        return httpx.AsyncClient(**self.client_kwargs(asynchronous=True))
+
+    def close(self):
+        """
+        Closes the pooled client
+        """
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        """
+        Closes the pooled client, caller holds the lock
+        """
+        if self._client is not None and not self._forked():
+            self._client.close()
+
+        self._client = None
+        self._pid = None
+
+    def _forked(self) -> bool:
+        """
+        Whether the client was created by another process
+        """
+        return self._pid is not None and self._pid != os.getpid()
+
+
+clients = ClientManager()
+
+atexit.register(clients.close)
+
+
+def get_client() -> httpx.Client:
+    """
+    Returns the process wide pooled client
+    """
+    return clients.get_client()
@@ -0,0 +1,102 @@
+"""
+Precompiled identifier extractors shared across the sitemap, listing and search models.
+Each extractor has a single value form and a batch form accepting lists or Series.
+"""
+
+import re
+from typing import Iterable
+
+import polars as pl
+
+ZPID_PATTERN: str = r"/([0-9]+)_zpid/"
+TIMESTAMP_PATTERN: str = r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z"
+TIMESTAMP_FORMAT: str = "%Y-%m-%dT%H:%M:%SZ"
+TIMESTAMP_DTYPE: pl.Datetime = pl.Datetime("us", "UTC")
+
+ZPID_REGEX: re.Pattern = re.compile(ZPID_PATTERN)
+TIMESTAMP_REGEX: re.Pattern = re.compile(TIMESTAMP_PATTERN)
+
+
+def extract_zpid(url: str) -> str | None:
+    """
+    Extracts the zillow id from a listing URL
+
+    Args:
+        url: Zillow listing URL
+
+    Returns:
+        zpid: The zillow id, None if the URL does not contain one
+    """
+    match: re.Match | None = ZPID_REGEX.search(url)
+
+    return match.group(1) if match else None
+
+
+def match_timestamp(value: str) -> str | None:
+    """
+    Matches an ISO timestamp at the start of a string
+
+    Args:
+        value: String beginning with a timestamp such as ``2024-08-14T14:53:00Z``
+
+    Returns:
+        timestamp: The matched timestamp, None if the string does not start with one
+    """
+    match: re.Match | None = TIMESTAMP_REGEX.match(value)
+
+    return match.group(0) if match else None
+
+
+def zpid_expr(urls: pl.Expr) -> pl.Expr:
+    """
+    Polars expression extracting zillow ids from a column of URLs
+    """
+    return urls.str.extract(ZPID_PATTERN, 1)
+
+
+def timestamp_match_expr(values: pl.Expr) -> pl.Expr:
+    """
+    Polars expression matching leading ISO timestamps like match_timestamp, null
+    where a string does not start with one
+    """
+    return values.str.extract(f"^({TIMESTAMP_PATTERN})", 1)
+
+
+def timestamp_expr(values: pl.Expr) -> pl.Expr:
+    """
+    Polars expression parsing leading ISO timestamps into UTC Datetimes, null where
+    no valid timestamp is found
+    """
+    return timestamp_match_expr(values).str.strptime(
+        TIMESTAMP_DTYPE, TIMESTAMP_FORMAT, strict=False
+    )
+
+
+def extract_zpids(urls: Iterable[str] | pl.Series) -> pl.Series:
+    """
+    Extracts zillow ids from a batch of listing URLs
+
+    Args:
+        urls: List or Series of Zillow listing URLs
+
+    Returns:
+        zpids: String Series, null where a URL does not contain an id
+    """
+    series: pl.Series = pl.Series("zpid", urls, dtype=pl.String)
+
+    return series.to_frame().select(zpid_expr(pl.col("zpid"))).to_series()
+
+
+def parse_timestamps(values: Iterable[str] | pl.Series) -> pl.Series:
+    """
+    Parses a batch of ISO timestamps
+
+    Args:
+        values: List or Series of timestamp strings
+
+    Returns:
+        timestamps: UTC Datetime Series, null where no valid timestamp is found
+    """
+    series: pl.Series = pl.Series("timestamp", values, dtype=pl.String)
+
+    return series.to_frame().select(timestamp_expr(pl.col("timestamp"))).to_series()
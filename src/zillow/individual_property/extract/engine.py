@@ -0,0 +1,221 @@
+"""
+Asyncio engine fetching listing pages over a single pooled async client. Fetches run
+under a concurrency cap that follows the adaptive controller and the shared endpoint
+rate limit while a process pool parse stage parses the pages, so the event loop only
+ever waits on the network. A fetch keeps its concurrency slot until the stage accepts
+its page, so a stage falling behind holds back the fetchers.
+"""
+
+import asyncio
+from typing import Awaitable, Callable
+
+import httpx
+import polars as pl
+from fake_useragent import UserAgent
+
+from zillow.adaptive import THROTTLE_STATUS_CODES, AdaptiveController, controller
+from zillow.cache import response_cache
+from zillow.csrf import CsrfTokenProvider, csrf_tokens
+from zillow.http import clients
+from zillow.individual_property.parse_stage import ParseStage
+from zillow.ratelimit import RateLimiter, rate_limiter
+
+
+class AdaptiveGate:
+    """
+    Semaphore whose limit is re-read from the adaptive controller on every acquire
+    """
+
+    def __init__(self, concurrency: int, adaptive: AdaptiveController | None):
+        self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.in_flight: int = 0
+        self._condition = asyncio.Condition()
+
+    def limit(self) -> int:
+        """
+        Current number of requests allowed in flight
+        """
+        if self.adaptive is None:
+            return self.concurrency
+
+        return min(self.concurrency, self.adaptive.concurrency)
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit())
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+class ListingFetcher:
+    """
+    Fetches many listing pages concurrently into a parse stage
+
+    Args:
+        concurrency: Maximum number of requests in flight
+        adaptive: Controller that lowers concurrency and adds delay under pressure
+        limiter: Rate limiter consulted before every request
+        endpoint: Budget of the limiter the requests count against
+        retries: Attempts per listing after the first failure
+        retry_delay: Base delay in seconds, doubled on every retry
+        tokens: Provider replacing the csrf token after a 403
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 20,
+        adaptive: AdaptiveController | None = controller,
+        limiter: RateLimiter = rate_limiter,
+        endpoint: str = "listing",
+        retries: int = 3,
+        retry_delay: float = 5,
+        tokens: CsrfTokenProvider = csrf_tokens,
+    ):
+        self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.limiter = limiter
+        self.endpoint = endpoint
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.tokens = tokens
+
+    async def fetch(
+        self, client: httpx.AsyncClient, property_url: str, csrf_token: str
+    ) -> bytes:
+        """
+        Requests a single listing page
+
+        Args:
+            client: Pooled async client
+            property_url: URL of the listing
+            csrf_token: Token for use across each worker node
+
+        Returns:
+            html_bytes: Listing page
+        """
+        headers = {"User-Agent": UserAgent().random, "csrfToken": csrf_token}
+
+        response: httpx.Response = await client.get(property_url, headers=headers)
+
+        response.raise_for_status()
+
+        return response.content
+
+    async def _fetch_with_retries(
+        self,
+        client: httpx.AsyncClient,
+        gate: AdaptiveGate,
+        property_url: str,
+        csrf_token: str,
+        handoff: Callable[[bytes], Awaitable[None]],
+    ):
+        """
+        Fetches a listing under the gate and rate limit, retrying failures, and hands
+        the page off before the gate is released so a stalled consumer stops further
+        fetches. A 403 refreshes the csrf token before the retry, concurrent listings
+        holding the same rejected token share one refresh.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                async with gate:
+                    if self.adaptive is not None:
+                        await self.adaptive.pause_async()
+                    await self.limiter.acquire_async(self.endpoint)
+                    html_bytes: bytes = await self.fetch(
+                        client, property_url, csrf_token
+                    )
+
+                    await handoff(html_bytes)
+                    return
+            except httpx.HTTPError as error:
+                if attempt == self.retries:
+                    raise
+                if (
+                    isinstance(error, httpx.HTTPStatusError)
+                    and error.response.status_code in THROTTLE_STATUS_CODES
+                ):
+                    csrf_token = await asyncio.to_thread(
+                        self.tokens.refresh, stale=csrf_token
+                    )
+                await asyncio.sleep(self.retry_delay * 2**attempt)
+
+    async def _stage(
+        self,
+        client: httpx.AsyncClient,
+        gate: AdaptiveGate,
+        stage: ParseStage,
+        property_url: str,
+        csrf_token: str,
+    ):
+        """
+        Gets a listing page from the response cache or the network and hands it to
+        the parse stage while holding a gate slot
+        """
+
+        async def handoff(html_bytes: bytes):
+            if response_cache.enabled:
+                await asyncio.to_thread(response_cache.put, property_url, html_bytes)
+            await stage.parse(property_url, html_bytes)
+
+        cached: bytes | None = None
+        if response_cache.enabled:
+            cached = await asyncio.to_thread(response_cache.get, property_url)
+
+        if cached is None:
+            await self._fetch_with_retries(
+                client, gate, property_url, csrf_token, handoff
+            )
+        else:
+            async with gate:
+                await stage.parse(property_url, cached)
+
+    async def fetch_frame(
+        self,
+        property_urls: list[str],
+        csrf_token: str,
+        stage: ParseStage | None = None,
+    ) -> tuple[pl.DataFrame, dict[str, str]]:
+        """
+        Fetches every listing while a process pool stage parses them into a frame
+
+        Args:
+            property_urls: URLs of the listings
+            csrf_token: Token for use across each worker node
+            stage: Parse stage, a new one over the shared process pool if None
+
+        Returns:
+            df: Every listing that was collected
+            failures: Error of every listing that failed, by URL
+        """
+        stage = stage or ParseStage()
+        gate = AdaptiveGate(self.concurrency, self.adaptive)
+
+        async with clients.async_client() as client:
+            results: list = await asyncio.gather(
+                *(
+                    self._stage(client, gate, stage, url, csrf_token)
+                    for url in property_urls
+                ),
+                return_exceptions=True,
+            )
+
+        df, failures = await stage.close()
+
+        for property_url, result in zip(property_urls, results):
+            if isinstance(result, BaseException):
+                failures[property_url] = repr(result)
+
+        return df, failures
+
+    def run_frame(
+        self, property_urls: list[str], csrf_token: str, stage: ParseStage | None = None
+    ) -> tuple[pl.DataFrame, dict[str, str]]:
+        """
+        Runs fetch_frame on a new event loop
+        """
+        return asyncio.run(self.fetch_frame(property_urls, csrf_token, stage))
@@ -2,22 +2,99 @@
 Module dealing with extraction of listing data
 """
 
+from typing import Iterable
+
 import orjson
 from bs4 import BeautifulSoup
 from prefect import task
+from prefecto.logging import get_prefect_or_default_logger
 
+from zillow.spool import SpoolHandle, resolve_bytes
 
-@task(description="Parses HTML file for listing JSON")
-def collect_listing_attrs(html_bytes: bytes) -> dict:
+NEXT_DATA_MARKER: bytes = b'id="__NEXT_DATA__"'
+SCRIPT_OPEN: bytes = b"<script"
+SCRIPT_CLOSE: bytes = b"</script>"
+CLIENT_CACHE_KEY: bytes = b'"gdpClientCache":'
+CLIENT_CACHE_END: bytes = b'}"'
+
+
+def _next_data_bounds(html_bytes: bytes) -> tuple[int, int] | None:
     """
-    Parses html file from a zillow listing and searches for the json attributes
+    Finds the start and end offsets of the ``__NEXT_DATA__`` script contents
+    """
+    marker: int = html_bytes.find(NEXT_DATA_MARKER)
+    if marker == -1:
+        return None
+
+    tag_start: int = html_bytes.rfind(SCRIPT_OPEN, 0, marker)
+    if tag_start == -1 or html_bytes.find(b">", tag_start, marker) != -1:
+        return None
+
+    start: int = html_bytes.find(b">", marker)
+    if start == -1:
+        return None
+
+    end: int = html_bytes.find(SCRIPT_CLOSE, start)
+    if end == -1:
+        return None
+
+    return start + 1, end
+
+
+def scan_next_data(html_bytes: bytes) -> memoryview | None:
+    """
+    Locates the ``__NEXT_DATA__`` script payload by scanning the raw bytes
 
     Args:
         html_bytes: html from requested zillow listing
 
     Returns:
-        property_json: JSON containing listings' attributes
+        payload: Zero-copy slice of the script contents, None if it cannot be found
+    """
+    bounds: tuple[int, int] | None = _next_data_bounds(html_bytes)
+    if bounds is None:
+        return None
+
+    start, end = bounds
+
+    return memoryview(html_bytes)[start:end]
 
+
+def scan_client_cache(html_bytes: bytes) -> memoryview | None:
+    """
+    Locates the encoded ``gdpClientCache`` string inside ``__NEXT_DATA__`` so it can
+    be decoded without decoding the rest of the page json. Every quote inside the
+    string is escaped and the cache is a json object, so the first ``}"`` after the
+    key closes the string.
+
+    Args:
+        html_bytes: html from requested zillow listing
+
+    Returns:
+        payload: Zero-copy slice of the json string token, quotes included, None if
+            it cannot be found
+    """
+    bounds: tuple[int, int] | None = _next_data_bounds(html_bytes)
+    if bounds is None:
+        return None
+
+    start, end = bounds
+
+    key: int = html_bytes.find(CLIENT_CACHE_KEY, start, end)
+    if key == -1:
+        return None
+
+    value: int = key + len(CLIENT_CACHE_KEY)
+    close: int = html_bytes.find(CLIENT_CACHE_END, value, end)
+    if close == -1 or html_bytes[value : value + 1] != b'"':
+        return None
+
+    return memoryview(html_bytes)[value : close + len(CLIENT_CACHE_END)]
+
+
+def _soup_next_data(html_bytes: bytes) -> dict:
+    """
+    Locates and decodes the ``__NEXT_DATA__`` script by building the full DOM
     """
     soup = BeautifulSoup(html_bytes, "html.parser")
 
@@ -27,14 +104,88 @@ def collect_listing_attrs(html_bytes: bytes) -> dict:
 
     assert len(listing_raw) == 1
 
-    json_file: dict = orjson.loads(str(listing_raw[0]))
+    return orjson.loads(str(listing_raw[0]))
 
-    raw_property_json: dict = orjson.loads(
+
+def load_next_data(html_bytes: bytes, fast: bool = True) -> dict:
+    """
+    Decodes the ``__NEXT_DATA__`` json of a listing page
+
+    Args:
+        html_bytes: html from requested zillow listing
+        fast: Scan the bytes for the payload, falling back to BeautifulSoup if the
+            scan or decode fails
+
+    Returns:
+        json_file: Decoded ``__NEXT_DATA__`` json
+    """
+    if fast:
+        payload: memoryview | None = scan_next_data(html_bytes)
+
+        if payload is not None:
+            try:
+                return orjson.loads(payload)
+            except orjson.JSONDecodeError as exc:
+                logger = get_prefect_or_default_logger()
+                logger.warning(f"Fast __NEXT_DATA__ decode failed ({exc}), using soup")
+
+    return _soup_next_data(html_bytes)
+
+
+def load_client_cache(html_bytes: bytes, fast: bool = True) -> dict:
+    """
+    Decodes the ``gdpClientCache`` json of a listing page
+
+    Args:
+        html_bytes: html from requested zillow listing
+        fast: Decode only the cache string, skipping the rest of ``__NEXT_DATA__``
+
+    Returns:
+        raw_property_json: Decoded client cache keyed by query
+    """
+    if fast:
+        payload: memoryview | None = scan_client_cache(html_bytes)
+
+        if payload is not None:
+            try:
+                return orjson.loads(orjson.loads(payload))
+            except orjson.JSONDecodeError:
+                pass
+
+    json_file: dict = load_next_data(html_bytes, fast)
+
+    return orjson.loads(
         json_file["props"]["pageProps"]["componentProps"]["gdpClientCache"]
     )
 
+
+@task(description="Parses HTML file for listing JSON")
+def collect_listing_attrs(
+    html_bytes: bytes | SpoolHandle,
+    fast: bool = True,
+    keys: Iterable[str] | None = None,
+) -> dict:
+    """
+    Parses html file from a zillow listing and searches for the json attributes
+
+    Args:
+        html_bytes: html from requested zillow listing, or a handle to it
+        fast: Locate the listing json without building a DOM or decoding
+            unrelated parts of the page
+        keys: Top level keys of the listing json to keep, e.g. ``["property"]``.
+            Everything else is dropped before the result leaves the task
+
+    Returns:
+        property_json: JSON containing listings' attributes
+
+    """
+    raw_property_json: dict = load_client_cache(resolve_bytes(html_bytes), fast)
+
     assert len(raw_property_json) == 1
 
-    property_json: dict = list(raw_property_json.values())[0]
+    property_json: dict = next(iter(raw_property_json.values()))
+
+    if keys is not None:
+        property_json = {key: property_json[key] for key in keys}
 
     return property_json
@@ -0,0 +1,185 @@
+"""
+Process pool stage parsing fetched listing pages. Fetchers hand pages to the stage,
+which batches them, extracts and transforms each batch in a worker process and sends
+the frame back as an Arrow IPC stream. A bound on the pages held by the stage makes
+``parse`` wait, and fetchers holding a concurrency slot while they wait stop further
+fetches, so the pages held in memory stay bounded by the fetch concurrency plus the
+pages the stage may hold.
+"""
+
+import asyncio
+import atexit
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import polars as pl
+
+from zillow.individual_property.extract.listing import collect_listing_attrs
+from zillow.individual_property.property_model import Property
+from zillow.individual_property.transform.listing import (
+    PROPERTY_SCHEMA,
+    properties_to_df,
+    validate_property,
+)
+
+
+def parse_listing_batch(pages: list[tuple[str, bytes]]) -> tuple[bytes, dict]:
+    """
+    Extracts, validates and transforms a batch of listing pages, run in a worker
+    process. A listing failing any step is recorded without failing the batch.
+
+    Args:
+        pages: Listing URL and page of every listing
+
+    Returns:
+        ipc: Arrow IPC stream of the listings that parsed
+        failures: Error of every listing that did not parse, by URL
+    """
+    properties: list[Property] = []
+    failures: dict[str, str] = {}
+
+    for property_url, html_bytes in pages:
+        try:
+            properties.append(
+                validate_property(
+                    collect_listing_attrs.fn(html_bytes, keys=["property"])
+                )
+            )
+        except Exception as error:
+            failures[property_url] = repr(error)
+
+    buffer = io.BytesIO()
+    properties_to_df(properties).write_ipc_stream(buffer)
+
+    return buffer.getvalue(), failures
+
+
+class ParsePool:
+    """
+    Lazily creates one spawn based process pool per process, recreated after a fork
+    """
+
+    def __init__(self, workers: int | None = None):
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._pid: int | None = None
+        self.workers = workers
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """
+        Returns the process wide pool, creating it if needed
+        """
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._pid = os.getpid()
+
+            return self._executor
+
+    def shutdown(self):
+        """
+        Stops the worker processes
+        """
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(cancel_futures=True)
+
+            self._executor = None
+            self._pid = None
+
+
+parse_pool = ParsePool()
+
+atexit.register(parse_pool.shutdown)
+
+
+class ParseStage:
+    """
+    Batches pages into a process pool, holding at most ``batch_size * max_pending``
+    pages between buffer and pool
+
+    Args:
+        batch_size: Pages parsed per worker task
+        max_pending: Batches held before ``parse`` waits, twice the CPU count if None
+        executor: Executor used instead of the shared process pool
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 25,
+        max_pending: int | None = None,
+        executor: Executor | None = None,
+    ):
+        self.batch_size = batch_size
+        self.max_pending = max_pending or 2 * (os.cpu_count() or 1)
+        self.executor = executor
+        self._buffer: list[tuple[str, bytes]] = []
+        self._slots: asyncio.Semaphore | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def parse(self, property_url: str, html_bytes: bytes):
+        """
+        Queues a page, waiting while the stage holds as many pages as it may
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.batch_size * self.max_pending)
+
+        await self._slots.acquire()
+        self._buffer.append((property_url, html_bytes))
+
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """
+        Ships the buffered pages to the pool
+        """
+        if not self._buffer:
+            return
+
+        pages, self._buffer = self._buffer, []
+
+        self._tasks.append(asyncio.create_task(self._run(pages)))
+
+    async def _run(self, pages: list[tuple[str, bytes]]) -> tuple[bytes, dict]:
+        """
+        Parses a batch in the pool and frees the slots of its pages
+        """
+        loop = asyncio.get_running_loop()
+        executor: Executor = self.executor or parse_pool.get_executor()
+
+        try:
+            return await loop.run_in_executor(executor, parse_listing_batch, pages)
+        finally:
+            for _ in pages:
+                self._slots.release()
+
+    async def close(self) -> tuple[pl.DataFrame, dict[str, str]]:
+        """
+        Parses the remaining pages and collects every batch
+
+        Returns:
+            df: Every listing that parsed
+            failures: Error of every listing that did not parse, by URL
+        """
+        self._flush()
+
+        results: list[tuple[bytes, dict]] = await asyncio.gather(*self._tasks)
+        self._tasks = []
+
+        frames: list[pl.DataFrame] = [pl.read_ipc_stream(ipc) for ipc, _ in results]
+        failures: dict[str, str] = {
+            url: error
+            for _, batch_failures in results
+            for url, error in batch_failures.items()
+        }
+
+        if not frames:
+            return pl.DataFrame(schema=PROPERTY_SCHEMA), failures
+
+        return pl.concat(frames, how="vertical"), failures
@@ -2,6 +2,43 @@ import polars as pl
 from prefect import task
 
 from zillow.individual_property.property_model import Property
+from zillow.schema import frame_from_models, model_schema
+
+PROPERTY_SCHEMA: pl.Schema = model_schema(Property)
+
+
+def validate_property(property_json: dict) -> Property:
+    """
+    Validates the ``property`` key of one listing json, so callers can record
+    failures per listing before building a batch frame
+    """
+    return Property.model_validate(property_json.get("property"))
+
+
+def properties_to_df(properties: list[Property]) -> pl.DataFrame:
+    """
+    Builds the fixed schema frame of already validated properties
+    """
+    return frame_from_models(properties, PROPERTY_SCHEMA)
+
+
+@task(description="Converts a batch of Property Models to a Dataframe")
+def property_jsons_to_df(property_jsons: list[dict]) -> pl.DataFrame:
+    """
+    Converts a batch of property jsons to a single polars dataframe with a fixed
+    schema, building each column once instead of a frame per listing
+
+    Args:
+        property_jsons: list of listing jsons each containing a ``property`` key
+
+    Returns:
+        df
+    """
+    properties: list[Property] = list(map(validate_property, property_jsons))
+
+    df: pl.DataFrame = properties_to_df(properties)
+
+    return df
 
 
 @task(description="Converts Property Model to Dataframe")
@@ -15,8 +52,4 @@ def property_json_to_df(property_json: dict) -> pl.DataFrame:
     Returns:
         df
     """
-    property = Property.model_validate(property_json.get("property")).model_dump()
-
-    df: pl.DataFrame = pl.from_dict(property).unnest("resoFacts").unnest("address")
-
-    return df
+    return property_jsons_to_df.fn([property_json])
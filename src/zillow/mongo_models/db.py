@@ -1,3 +1,7 @@
+from itertools import islice
+from typing import Iterator
+
+import polars as pl
 from pydantic import (
     BaseModel,
     Field,
@@ -58,4 +62,83 @@ def AbstractRepo(model, model_set, collection: str):
             """
             return model_set(self.find_by({}))
 
+        def iter_dicts(
+            self,
+            filter: dict | None = None,
+            projection: dict | None = None,
+            batch_size: int = 1000,
+        ) -> Iterator[dict]:
+            """
+            Lazily yields raw documents, fetching ``batch_size`` per round trip
+
+            Args:
+                filter: MongoDB query, every document if None
+                projection: Fields to return, every field if None
+                batch_size: Documents per cursor batch
+            """
+            yield from (
+                self.get_collection()
+                .find(filter or {}, projection)
+                .batch_size(batch_size)
+            )
+
+        def iter_all(
+            self,
+            filter: dict | None = None,
+            projection: dict | None = None,
+            batch_size: int = 1000,
+        ) -> Iterator[model]:
+            """
+            Lazily yields validated models. A projection must keep every required
+            field of the model
+
+            Args:
+                filter: MongoDB query, every document if None
+                projection: Fields to return, every field if None
+                batch_size: Documents per cursor batch
+            """
+            for document in self.iter_dicts(filter, projection, batch_size):
+                yield self.to_model(document)
+
+        def get_frame(
+            self,
+            filter: dict | None = None,
+            projection: dict | None = None,
+            batch_size: int = 10_000,
+            schema: pl.Schema | dict | None = None,
+        ) -> pl.DataFrame:
+            """
+            Builds a frame from cursor batches without creating models. Document
+            ids are returned as strings in an ``id`` column
+
+            Args:
+                filter: MongoDB query, every document if None
+                projection: Fields to return, every field if None
+                batch_size: Documents per cursor batch and frame chunk
+                schema: Schema of the frame, inferred from every document if None
+
+            Returns:
+                df
+            """
+            documents: Iterator[dict] = (
+                {
+                    ("id" if key == "_id" else key): (
+                        str(value) if key == "_id" else value
+                    )
+                    for key, value in document.items()
+                }
+                for document in self.iter_dicts(filter, projection, batch_size)
+            )
+
+            frames: list[pl.DataFrame] = []
+            while batch := list(islice(documents, batch_size)):
+                frames.append(
+                    pl.from_dicts(batch, schema=schema, infer_schema_length=None)
+                )
+
+            if not frames:
+                return pl.DataFrame(schema=schema)
+
+            return pl.concat(frames, how="vertical" if schema else "diagonal_relaxed")
+
     return Repository
@@ -46,6 +46,28 @@ class MapBounds(BaseModel):
         examples=[34.337306],
     )
 
+    def quadrants(self) -> list["MapBounds"]:
+        """
+        Splits the bounds into four equal tiles, north west first
+        """
+        middle_lon: float = (self.west + self.east) / 2
+        middle_lat: float = (self.south + self.north) / 2
+
+        return [
+            MapBounds(
+                west=self.west, east=middle_lon, south=middle_lat, north=self.north
+            ),
+            MapBounds(
+                west=middle_lon, east=self.east, south=middle_lat, north=self.north
+            ),
+            MapBounds(
+                west=self.west, east=middle_lon, south=self.south, north=middle_lat
+            ),
+            MapBounds(
+                west=middle_lon, east=self.east, south=self.south, north=middle_lat
+            ),
+        ]
+
 
 class RegionConfig(BaseDocument):
     """
@@ -71,6 +93,12 @@ class RegionConfig(BaseDocument):
         examples=[{"sortSelection": {"value": "globalrelevanceex"}}],
     )
 
+    def with_bounds(self, map_bounds: MapBounds) -> "RegionConfig":
+        """
+        Copies the config with new map bounds
+        """
+        return self.model_copy(update={"mapBounds": map_bounds})
+
 
 class RegionSet(DocumentSet):
     """
@@ -3,17 +3,32 @@ Module for MongoDB Sitemap module. Because each url has a last modified date we
 only extract urls which are different from the last modified date for each document
 """
 
-import re
 from functools import cached_property
+from itertools import islice
+from typing import Iterable
 
+import polars as pl
 from pendulum.datetime import DateTime
+from prefecto.logging import get_prefect_or_default_logger
 from pydantic import (
+    BaseModel,
     Field,
     computed_field,
     field_validator,
 )
 from pydantic.networks import HttpUrl
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from pymongo.results import BulkWriteResult
 
+from zillow.ids import (
+    TIMESTAMP_DTYPE,
+    extract_zpid,
+    match_timestamp,
+    timestamp_expr,
+    timestamp_match_expr,
+    zpid_expr,
+)
 from zillow.mongo_models.db import AbstractRepo, BaseDocument, DocumentSet
 
 
@@ -41,12 +56,10 @@ class Property(BaseDocument):
         """
         Zillow ID parsed from the URL listing
         """
-        REGEX_PATTERN = "\/([0-9]+)[_]zpid\/"
-
-        match: re.Match = re.search(REGEX_PATTERN, self.property_url)
+        zpid: str | None = extract_zpid(self.property_url)
 
-        if match:
-            return match.group(1)
+        if zpid:
+            return zpid
         else:
             raise ValueError("No Zillow ID found. URL Erroneous")
 
@@ -66,11 +79,8 @@ class Property(BaseDocument):
         """
         Last modified needs to be validated as a pendulum datetime instance
         """
-        REGEX_PATTERN = "\d{4}[-]\d{2}[-]\d{2}T\d{2}\:\d{2}\:\d{2}Z"
-
-        matched: re.Match = re.match(REGEX_PATTERN, value)
-        if matched:
-            date_string = matched.group(0)
+        date_string: str | None = match_timestamp(value)
+        if date_string:
             return date_string
         else:
             raise ValueError("No DateTime String could be parsed")
@@ -84,6 +94,107 @@ class PropertySet(DocumentSet):
     root: list[Property]
 
 
+# Host and port of an absolute URL, ended by a path, query or fragment like the URL
+# parser, which treats a backslash as a path separator
+URL_AUTHORITY_PATTERN: str = (
+    r"(?i)^[a-z][a-z0-9+.\-]*://(?:[^/\\?#@]*@)?([^/\\?#:]+)(?::(\d*))?(?:[/\\?#]|$)"
+)
+MAX_PORT: int = 65535
+
+PROPERTY_FRAME_SCHEMA = pl.Schema(
+    {
+        "property_url": pl.String,
+        "last_modified": TIMESTAMP_DTYPE,
+        "zillow_id": pl.String,
+    }
+)
+
+
+def validate_property_frame(records: list[dict]) -> pl.DataFrame:
+    """
+    Validates parsed sitemap records with Polars expressions instead of building a
+    Property model per record. Applies the same checks as Property: the URL must be
+    a URL on www.zillow.com with a valid port and contain a zpid, and last_modified
+    must start with an ISO timestamp. Timestamps are rejected by pattern only, as
+    the model does, so an impossible calendar date passes and parses to null.
+
+    URLs are matched by pattern rather than by the URL parser, so input the parser
+    normalizes first is rejected here while the model accepts it: leading spaces,
+    tabs or newlines, percent-encoded hosts and a single slash or backslashes after
+    the scheme. Sitemap URLs are never written that way.
+
+    Args:
+        records: dicts with ``property_url`` and ``last_modified`` keys
+
+    Returns:
+        df: property_url, last_modified as a UTC Datetime and zillow_id
+
+    Raises:
+        ValueError: If any record fails validation
+    """
+    df: pl.DataFrame = pl.DataFrame(
+        records, schema={"property_url": pl.String, "last_modified": pl.String}
+    )
+
+    port: pl.Expr = pl.col("port").str.strip_chars_start("0")
+
+    validated: pl.DataFrame = df.with_columns(
+        last_modified_raw=pl.col("last_modified"),
+        host=pl.col("property_url")
+        .str.extract(URL_AUTHORITY_PATTERN, 1)
+        .str.to_lowercase(),
+        port=pl.col("property_url").str.extract(URL_AUTHORITY_PATTERN, 2),
+        zillow_id=zpid_expr(pl.col("property_url")),
+        last_modified=timestamp_match_expr(pl.col("last_modified")),
+    )
+
+    is_valid: pl.Expr = (
+        (pl.col("host") == "www.zillow.com")
+        & (
+            pl.col("port").is_null()
+            | (port == "")
+            | (
+                (port.str.len_chars() <= len(str(MAX_PORT)))
+                & (port.str.to_integer(strict=False) <= MAX_PORT)
+            )
+        )
+        & pl.col("zillow_id").is_not_null()
+        & pl.col("last_modified").is_not_null()
+    ).fill_null(False)
+
+    rejected: pl.DataFrame = validated.filter(~is_valid).select(
+        "property_url", last_modified="last_modified_raw"
+    )
+
+    if not rejected.is_empty():
+        raise ValueError(
+            f"{rejected.height} sitemap records failed validation, "
+            f"first: {rejected.row(0, named=True)}"
+        )
+
+    return validated.select(
+        "property_url",
+        last_modified=timestamp_expr(pl.col("last_modified_raw")),
+        zillow_id="zillow_id",
+    )
+
+
+class UpsertCounts(BaseModel):
+    """
+    Outcome of a bulk upsert
+    """
+
+    inserted: int = Field(
+        name="Inserted", description="Documents created", default=0, examples=[120]
+    )
+    updated: int = Field(
+        name="Updated", description="Documents whose fields changed", default=0
+    )
+    unchanged: int = Field(
+        name="Unchanged", description="Documents matched without changes", default=0
+    )
+
+
 class ZillowRepository(AbstractRepo(Property, PropertySet, "product_zillow")):
     """
     Zillow Repository Model
@@ -95,3 +206,131 @@ class ZillowRepository(AbstractRepo(Property, PropertySet, "product_zillow")):
         """
 
         return self.find_one_by({"zillow_id": zid})
+
+    def find_duplicate_ids(self, limit: int = 20) -> list[str]:
+        """
+        Finds zillow ids stored on more than one document
+
+        Args:
+            limit: Maximum number of ids returned
+
+        Returns:
+            zillow_ids: Duplicated zillow ids
+        """
+        return [
+            group["_id"]
+            for group in self.get_collection().aggregate(
+                [
+                    {"$group": {"_id": "$zillow_id", "count": {"$sum": 1}}},
+                    {"$match": {"count": {"$gt": 1}}},
+                    {"$sort": {"_id": 1}},
+                    {"$limit": limit},
+                ]
+            )
+        ]
+
+    def ensure_indexes(self) -> bool:
+        """
+        Creates the unique zillow_id index used by the sitemap diff and upserts, so
+        concurrent upserts of one property cannot insert it twice. Collections with
+        duplicate zillow ids or an older non-unique index are left as they are and
+        logged, migrate_indexes replaces the index once they are cleaned
+
+        Returns:
+            created: Whether the unique index is in place
+        """
+        try:
+            self.get_collection().create_index("zillow_id", unique=True)
+        except OperationFailure as error:
+            duplicates: list[str] = self.find_duplicate_ids()
+
+            get_prefect_or_default_logger().warning(
+                f"Unique zillow_id index not created ({error}), upserts run without "
+                + (
+                    f"it until duplicate zillow ids {duplicates} are cleaned and "
+                    if duplicates
+                    else "it until "
+                )
+                + "migrate_indexes is run"
+            )
+            return False
+
+        return True
+
+    def migrate_indexes(self):
+        """
+        Replaces a non-unique zillow_id index with the unique one
+
+        Raises:
+            ValueError: If zillow ids are duplicated, they must be cleaned first
+        """
+        if duplicates := self.find_duplicate_ids():
+            raise ValueError(
+                f"Duplicate zillow ids must be cleaned first: {duplicates}"
+            )
+
+        collection = self.get_collection()
+        index: dict | None = collection.index_information().get("zillow_id_1")
+
+        if index is not None and not index.get("unique", False):
+            collection.drop_index("zillow_id_1")
+
+        collection.create_index("zillow_id", unique=True)
+
+    def find_last_modified(self, zillow_ids: list[str]) -> pl.DataFrame:
+        """
+        Looks up the stored last modified date of a chunk of properties through the
+        zillow_id index, projecting only the fields the diff needs
+
+        Args:
+            zillow_ids: Zillow ids to look up
+
+        Returns:
+            df: zillow_id and last_modified of the stored documents
+        """
+        return self.get_frame(
+            {"zillow_id": {"$in": zillow_ids}},
+            {"_id": 0, "zillow_id": 1, "last_modified": 1},
+            schema={"zillow_id": pl.String, "last_modified": pl.String},
+        )
+
+    def upsert_many(
+        self, records: Iterable[dict], batch_size: int = 1000
+    ) -> UpsertCounts:
+        """
+        Inserts or updates properties keyed on zillow_id with unordered bulk writes,
+        one round trip per batch
+
+        Args:
+            records: dicts with property_url, last_modified and zillow_id keys
+            batch_size: Documents written per round trip
+
+        Returns:
+            counts: Inserted, updated and unchanged documents
+        """
+        counts = UpsertCounts()
+        collection = self.get_collection()
+        records = iter(records)
+
+        while batch := list(islice(records, batch_size)):
+            requests: list[UpdateOne] = [
+                UpdateOne(
+                    {"zillow_id": record["zillow_id"]},
+                    {
+                        "$set": {
+                            "property_url": record["property_url"],
+                            "last_modified": record["last_modified"],
+                        }
+                    },
+                    upsert=True,
+                )
+                for record in batch
+            ]
+
+            result: BulkWriteResult = collection.bulk_write(requests, ordered=False)
+
+            counts.inserted += result.upserted_count
+            counts.updated += result.modified_count
+            counts.unchanged += result.matched_count - result.modified_count
+
+        return counts
@@ -2,18 +2,28 @@
 Module to manage query creation
 """
 
-import random
-import time
-
 import httpx
+import orjson
 import polars as pl
 from fake_useragent import UserAgent
 from prefect import task
+from prefect.tasks import exponential_backoff
 from pydantic import BaseModel, Field
 
 from flows.utility import modify_param_on_retry
+from zillow.adaptive import controller
+from zillow.cache import response_cache
+from zillow.http import get_client
 from zillow.mongo_models.query_config import RegionConfig
+from zillow.ratelimit import rate_limiter
+from zillow.schema import frame_from_models, model_schema
 from zillow.searchset.query_model import ResultSet
+from zillow.spool import PAYLOAD_RESULT_OPTIONS, SpoolHandle, resolve_json, spool
+
+SEARCH_URL: str = "https://www.zillow.com/async-create-search-page-state"
+PAGE_CAP: int = 20
+RESULT_RENAME: dict = {"unformattedPrice": "price"}
+RESULT_SCHEMA: pl.Schema = model_schema(ResultSet, rename=RESULT_RENAME)
 
 
 class Payload(BaseModel):
@@ -51,29 +61,49 @@ class Payload(BaseModel):
         )
 
 
-@task(name="Query Search", description="Calls a page from zillow's result set")
+@task(
+    name="Query Search",
+    description="Calls a page from zillow's result set",
+    retries=3,
+    retry_delay_seconds=exponential_backoff(10),
+    retry_jitter_factor=0.5,
+    **PAYLOAD_RESULT_OPTIONS,
+)
 def query_search(
-    csrf_token: str, region_config: RegionConfig, page_num: int | None = None
-):
+    csrf_token: str,
+    region_config: RegionConfig,
+    page_num: int | None = None,
+    spooled: bool = False,
+) -> dict | SpoolHandle:
     """
     Sends a search query to zillow
-    """
-
-    sleep_time: int = random.randint(30, 60)
-    time.sleep(sleep_time)
 
-    csrf_token = modify_param_on_retry(csrf_token)
-
-    headers = {"User-Agent": UserAgent().random, "csrfToken": csrf_token}
-    client: httpx.Client = httpx.Client()
+    Args:
+        csrf_token: Token for use across each worker node
+        region_config: Static attributes for a region
+        page_num: Page of the result set, the first page if None
+        spooled: Return a handle to the spooled response instead of its JSON
+    """
 
     if page_num is None:
         page_num = 1
 
     payload = Payload.from_config(region_config, page_num).model_dump()
 
+    cached: bytes | None = response_cache.get(SEARCH_URL, payload)
+    if cached is not None:
+        return spool.put(cached) if spooled else orjson.loads(cached)
+
+    controller.pause()
+    rate_limiter.acquire("search")
+
+    csrf_token = modify_param_on_retry(csrf_token)
+
+    headers = {"User-Agent": UserAgent().random, "csrfToken": csrf_token}
+    client: httpx.Client = get_client()
+
     r: httpx.Response = client.put(
-        "https://www.zillow.com/async-create-search-page-state",
+        SEARCH_URL,
         headers=headers,
         json=payload,
         timeout=120,
@@ -81,41 +111,68 @@ def query_search(
 
     r.raise_for_status()
 
-    return r.json()
+    response_cache.put(SEARCH_URL, r.content, payload)
+
+    return spool.put(r.content) if spooled else r.json()
 
 
 @task(name="Parse First Page")
-def parse_max_pages(first_page_json: dict) -> list[int]:
+def parse_max_pages(first_page_json: dict | SpoolHandle) -> list[int]:
     """
     Returns the max page length from first page
 
     Args:
-        first_page_json: dict
+        first_page_json: dict, or a handle to it
 
     Returns:
         total_pages: Total count of paginated pages
     """
 
+    first_page_json = resolve_json(first_page_json)
+
     pages: int = first_page_json.get("cat1").get("searchList").get("totalPages")
 
     return [i for i in range(2, pages + 1)]
 
 
+def exceeds_page_cap(
+    first_page_json: dict | SpoolHandle, page_cap: int = PAGE_CAP
+) -> bool:
+    """
+    Whether the search has more results than its pages can return
+
+    Args:
+        first_page_json: dict, or a handle to it
+        page_cap: Maximum number of pages zillow serves for a search
+
+    Returns:
+        truncated: True if results past the last page would be lost
+    """
+    search_list: dict = resolve_json(first_page_json).get("cat1").get("searchList")
+
+    total: int = search_list.get("totalResultCount") or 0
+    per_page: int = search_list.get("resultsPerPage") or 0
+
+    return per_page > 0 and total > page_cap * per_page
+
+
 @task(name="Parse Page Content")
-def parse_result_content(page_json: dict) -> list[int]:
+def parse_result_content(page_json: dict | SpoolHandle) -> list[int]:
     """
     Returns the max page length from first page
 
     Args:
-        first_page_json: dict
+        first_page_json: dict, or a handle to it
 
     Returns:
         total_pages: Total count of paginated pages
     """
-    data: list = page_json.get("cat1").get("searchResults").get("listResults")
+    data: list = (
+        resolve_json(page_json).get("cat1").get("searchResults").get("listResults")
+    )
 
     results = list(map(ResultSet.model_validate, data))
 
-    df = pl.from_dicts(results).rename({"unformattedPrice": "price"})
+    df = frame_from_models(results, RESULT_SCHEMA, RESULT_RENAME)
 
     return df
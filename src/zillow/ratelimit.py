@@ -0,0 +1,221 @@
+"""
+Module for request rate limiting. Each endpoint gets a token bucket budget so workers
+send requests at exactly the allowed rate, optionally sharing one global budget
+through MongoDB.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+
+class Budget(BaseModel):
+    """
+    Request budget for an endpoint
+    """
+
+    rate: float = Field(
+        name="Rate", description="Sustained requests per second", gt=0, examples=[0.5]
+    )
+    capacity: int = Field(
+        name="Capacity",
+        description="Requests that may burst before the rate applies",
+        default=1,
+        ge=1,
+    )
+    jitter: float = Field(
+        name="Jitter",
+        description="Random extra wait as a fraction of the request interval",
+        default=0.1,
+        ge=0,
+    )
+
+
+DEFAULT_BUDGETS: dict[str, Budget] = {
+    "listing": Budget(rate=0.5, capacity=5),
+    "search": Budget(rate=0.2, capacity=2),
+    "sitemap": Budget(rate=2, capacity=10),
+}
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket. Tokens may go negative so callers queue up behind each
+    other instead of racing for the next token.
+    """
+
+    def __init__(self, budget: Budget, clock: Callable[[], float] = time.monotonic):
+        self.budget = budget
+        self.clock = clock
+        self.tokens: float = budget.capacity
+        self.updated: float = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token
+
+        Returns:
+            wait: Seconds to wait before the request may be sent
+        """
+        with self._lock:
+            now: float = self.clock()
+            self.tokens = min(
+                self.budget.capacity,
+                self.tokens + (now - self.updated) * self.budget.rate,
+            )
+            self.updated = now
+            self.tokens -= 1
+
+            return 0 if self.tokens >= 0 else -self.tokens / self.budget.rate
+
+
+class MongoRateLimitStore:
+    """
+    Shares budgets between workers with a fixed window counter per endpoint. Each
+    window allows ``capacity`` requests and lasts ``capacity / rate`` seconds.
+
+    Args:
+        collection: Collection holding the window counters
+    """
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """
+        Creates the TTL index removing window counters once their window is over
+        """
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def reserve(self, endpoint: str, budget: Budget) -> float:
+        """
+        Counts a request against the current window
+
+        Returns:
+            wait: 0 if the request fits the window, otherwise seconds until the next
+                window when the caller should try again
+        """
+        window_seconds: float = budget.capacity / budget.rate
+        now: float = time.time()
+        window: int = int(now // window_seconds)
+        window_end: float = (window + 1) * window_seconds
+
+        counter: dict = self.collection.find_one_and_update(
+            {"_id": f"{endpoint}:{window}"},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {
+                    "expires_at": datetime.fromtimestamp(window_end, timezone.utc)
+                    + timedelta(seconds=window_seconds)
+                },
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+        return 0 if counter["count"] <= budget.capacity else window_end - now
+
+
+class RateLimiter:
+    """
+    Per endpoint request budgets
+
+    Args:
+        budgets: Budget per endpoint name, endpoints without one are not limited
+        store: Shared store enforcing one budget across all workers, local token
+            buckets are used if None
+    """
+
+    def __init__(
+        self,
+        budgets: dict[str, Budget] | None = None,
+        store: MongoRateLimitStore | None = None,
+    ):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, TokenBucket] = {}
+        self.budgets: dict[str, Budget] = dict(budgets or {})
+        self.store = store
+
+    def configure(self, endpoint: str, budget: Budget | None):
+        """
+        Sets or removes the budget of an endpoint
+        """
+        with self._lock:
+            self._buckets.pop(endpoint, None)
+            if budget is None:
+                self.budgets.pop(endpoint, None)
+            else:
+                self.budgets[endpoint] = budget
+
+    def use_store(self, store: MongoRateLimitStore | None):
+        """
+        Switches between the shared store and local token buckets
+        """
+        self.store = store
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        """
+        Returns the local bucket of an endpoint
+        """
+        with self._lock:
+            if endpoint not in self._buckets:
+                self._buckets[endpoint] = TokenBucket(self.budgets[endpoint])
+
+            return self._buckets[endpoint]
+
+    def _reserve(self, endpoint: str) -> float:
+        """
+        Reserves a request and returns the seconds to wait, jitter included
+        """
+        budget: Budget = self.budgets[endpoint]
+
+        if self.store is not None:
+            wait: float = self.store.reserve(endpoint, budget)
+        else:
+            wait = self._bucket(endpoint).reserve()
+
+        if wait > 0:
+            wait += random.uniform(0, budget.jitter / budget.rate)
+
+        return wait
+
+    def acquire(self, endpoint: str):
+        """
+        Blocks until a request to the endpoint fits the budget
+        """
+        if endpoint not in self.budgets:
+            return
+
+        if self.store is None:
+            time.sleep(self._reserve(endpoint))
+            return
+
+        while (wait := self._reserve(endpoint)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, endpoint: str):
+        """
+        Waits without blocking the event loop until a request fits the budget
+        """
+        if endpoint not in self.budgets:
+            return
+
+        if self.store is None:
+            await asyncio.sleep(self._reserve(endpoint))
+            return
+
+        # The shared store does blocking IO, keep it off the event loop
+        while (wait := await asyncio.to_thread(self._reserve, endpoint)) > 0:
+            await asyncio.sleep(wait)
+
+
+rate_limiter = RateLimiter(DEFAULT_BUDGETS)
@@ -0,0 +1,251 @@
+"""
+Module replaying archived raw responses through the transforms so model changes can
+be backfilled without scraping again. Listing HTML and search JSON are read from a
+response cache or a directory of raw files, parsed across a process pool and
+appended to the Parquet sink.
+"""
+
+import multiprocessing
+import re
+import tempfile
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+
+import orjson
+import polars as pl
+from prefect.blocks.core import Block
+from prefecto.logging import get_prefect_or_default_logger
+from pydantic import BaseModel, Field
+
+from zillow.cache import CONTEXT_SUFFIX
+from zillow.individual_property.extract.listing import collect_listing_attrs
+from zillow.individual_property.property_model import Property
+from zillow.individual_property.transform.listing import (
+    properties_to_df,
+    validate_property,
+)
+from zillow.query import parse_result_content
+from zillow.sink import ParquetSink
+
+ARCHIVE_SUFFIXES: frozenset[str] = frozenset({".z", ".html", ".json"})
+DATE_DIRECTORY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+UNATTRIBUTED_DATASET: str = "pricing_unattributed"
+
+
+class ReplayCounts(BaseModel):
+    """
+    Outcome of a replay
+    """
+
+    listings: int = Field(
+        name="Listings", description="Listing rows written", default=0
+    )
+    results: int = Field(
+        name="Search Results", description="Search result rows written", default=0
+    )
+    unattributed: int = Field(
+        name="Unattributed",
+        description="Search result rows without a region, written apart from pricing",
+        default=0,
+    )
+    failed: int = Field(
+        name="Failed", description="Archived responses that did not parse", default=0
+    )
+
+
+def iter_archive(root: Path) -> Iterator[Path]:
+    """
+    Yields every archived response below a directory
+    """
+    for path in sorted(root.rglob("*")):
+        if path.suffix in ARCHIVE_SUFFIXES and path.is_file():
+            yield path
+
+
+def read_archived(path: Path) -> bytes:
+    """
+    Reads a raw response, decompressing response cache entries
+    """
+    content: bytes = path.read_bytes()
+
+    return zlib.decompress(content) if path.suffix == ".z" else content
+
+
+def archived_date(path: Path) -> date | None:
+    """
+    Date of the response cache partition holding an entry
+    """
+    for parent in path.parents:
+        if DATE_DIRECTORY.match(parent.name):
+            return date.fromisoformat(parent.name)
+
+    return None
+
+
+def archived_region(path: Path) -> str | None:
+    """
+    Searched region of a response cache entry, read from the request context the
+    cache stores beside it
+    """
+    context_path: Path = path.with_suffix(CONTEXT_SUFFIX)
+    if not context_path.is_file():
+        return None
+
+    payload: dict | None = orjson.loads(context_path.read_bytes()).get("payload")
+
+    return ((payload or {}).get("searchQueryState") or {}).get("usersSearchTerm")
+
+
+def replay_chunk(
+    paths: list[Path],
+) -> tuple[pl.DataFrame, pl.DataFrame, dict[str, str]]:
+    """
+    Parses a chunk of archived responses, run in a worker process. Listings are
+    validated one at a time and transformed into one frame per chunk.
+
+    Args:
+        paths: Archived responses
+
+    Returns:
+        listings: Listing rows with an ``as_of_date`` column
+        results: Search result rows with ``region`` and ``as_of_date`` columns, the
+            region is null when the archive holds no request context
+        failures: Error of every response that did not parse, by path
+    """
+    properties: list[Property] = []
+    listing_dates: list[date | None] = []
+    results: list[pl.DataFrame] = []
+    failures: dict[str, str] = {}
+
+    for path in paths:
+        as_of_date: date | None = archived_date(path)
+        try:
+            content: bytes = read_archived(path)
+
+            if content.lstrip()[:1] == b"{":
+                results.append(
+                    parse_result_content.fn(orjson.loads(content))
+                    .cast({"zpid": pl.String})
+                    .with_columns(
+                        region=pl.lit(archived_region(path), dtype=pl.String),
+                        as_of_date=pl.lit(as_of_date, dtype=pl.Date),
+                    )
+                )
+            else:
+                properties.append(
+                    validate_property(
+                        collect_listing_attrs.fn(content, keys=["property"])
+                    )
+                )
+                listing_dates.append(as_of_date)
+        except Exception as error:
+            failures[str(path)] = repr(error)
+
+    listings: pl.DataFrame = (
+        properties_to_df(properties).with_columns(
+            as_of_date=pl.Series(listing_dates, dtype=pl.Date)
+        )
+        if properties
+        else pl.DataFrame()
+    )
+
+    return (
+        listings,
+        pl.concat(results, how="vertical") if results else pl.DataFrame(),
+        failures,
+    )
+
+
+def replay(
+    source: Path,
+    sink: ParquetSink,
+    workers: int | None = None,
+    chunk_size: int = 200,
+    executor: Executor | None = None,
+) -> ReplayCounts:
+    """
+    Replays every archived response below a directory into the sink
+
+    Args:
+        source: Response cache root or directory of raw ``.html`` / ``.json`` files
+        sink: Sink the ``listings`` and ``pricing`` datasets are appended to. Search
+            results whose region cannot be recovered go to ``pricing_unattributed``
+        workers: Worker processes, one per core if None
+        chunk_size: Responses parsed per worker task
+        executor: Executor used instead of a new process pool
+
+    Returns:
+        counts: Rows written and responses that failed
+    """
+    logger = get_prefect_or_default_logger()
+    paths: list[Path] = list(iter_archive(source))
+    chunks: list[list[Path]] = [
+        paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)
+    ]
+
+    pool: Executor = executor or ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    counts = ReplayCounts()
+
+    try:
+        for listings, results, failures in pool.map(replay_chunk, chunks):
+            if not listings.is_empty():
+                sink.write(listings, "listings")
+            if not results.is_empty():
+                attributed: pl.Expr = pl.col("region").is_not_null()
+                # Rows without a region would land in the null partition of pricing
+                for dataset, rows in (
+                    ("pricing", results.filter(attributed)),
+                    (UNATTRIBUTED_DATASET, results.filter(~attributed)),
+                ):
+                    if not rows.is_empty():
+                        sink.write(rows, dataset)
+
+                counts.unattributed += results.filter(~attributed).height
+
+            counts.listings += listings.height
+            counts.results += results.height
+            counts.failed += len(failures)
+
+            for path, error in failures.items():
+                logger.warning(f"Failed to replay {path}: {error}")
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+    logger.info(
+        f"Replayed {len(paths)} responses: {counts.listings} listings, "
+        f"{counts.results} search results, {counts.failed} failed"
+    )
+
+    return counts
+
+
+def replay_location(
+    source: str, output: str, workers: int | None = None, chunk_size: int = 200
+) -> ReplayCounts:
+    """
+    Replays from a directory or an S3 bucket block into a sink location
+
+    Args:
+        source: Directory, or ``s3-bucket/<block name>`` which is downloaded first
+        output: Directory or ``s3-bucket/<block name>`` to write to
+        workers: Worker processes, one per core if None
+        chunk_size: Responses parsed per worker task
+
+    Returns:
+        counts: Rows written and responses that failed
+    """
+    sink: ParquetSink = ParquetSink.from_output(output)
+
+    if not source.startswith("s3-bucket/"):
+        return replay(Path(source), sink, workers, chunk_size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        Block.load(source).download_folder_to_path("", directory)
+
+        return replay(Path(directory), sink, workers, chunk_size)
@@ -0,0 +1,131 @@
+"""
+Module deriving static Polars schemas from the pydantic models so frames are built
+without dtype inference and batches always share one schema
+"""
+
+import types
+from functools import cache
+from typing import Iterable, Union, get_args, get_origin
+
+import polars as pl
+from pydantic import BaseModel
+
+SCALAR_DTYPES: dict[type, pl.DataType] = {
+    bool: pl.Boolean,
+    int: pl.Int64,
+    float: pl.Float64,
+    str: pl.String,
+}
+
+
+def polars_dtype(annotation) -> pl.DataType:
+    """
+    Maps a pydantic field annotation to a Polars dtype
+
+    Args:
+        annotation: Field annotation, e.g. ``int | None`` or ``list[str]``
+
+    Returns:
+        dtype: Matching Polars dtype. Bare ``list`` annotations become lists of
+            strings and nested models become structs
+    """
+    origin = get_origin(annotation)
+
+    if origin in (Union, types.UnionType):
+        args: list = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            raise TypeError(f"Cannot map union {annotation} to a Polars dtype")
+        return polars_dtype(args[0])
+
+    if annotation is list or origin is list:
+        args = get_args(annotation)
+        return pl.List(polars_dtype(args[0]) if args else pl.String)
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return pl.Struct(model_schema(annotation, unnest=False))
+
+    if annotation in SCALAR_DTYPES:
+        return SCALAR_DTYPES[annotation]
+
+    raise TypeError(f"Cannot map {annotation} to a Polars dtype")
+
+
+@cache
+def _model_schema(
+    model: type[BaseModel], unnest: bool, rename: tuple[tuple[str, str], ...]
+) -> pl.Schema:
+    """
+    Cached body of model_schema
+    """
+    renames: dict = dict(rename)
+    schema: dict = {}
+
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if (
+            unnest
+            and isinstance(annotation, type)
+            and issubclass(annotation, BaseModel)
+        ):
+            schema.update(model_schema(annotation, unnest=True))
+        else:
+            schema[renames.get(name, name)] = polars_dtype(annotation)
+
+    return pl.Schema(schema)
+
+
+def model_schema(
+    model: type[BaseModel], unnest: bool = True, rename: dict | None = None
+) -> pl.Schema:
+    """
+    Derives a Polars schema from a pydantic model
+
+    Args:
+        model: Pydantic model class
+        unnest: Flatten nested models in place, matching ``DataFrame.unnest``
+        rename: Mapping of field names to output column names
+
+    Returns:
+        schema: Polars schema in field order
+    """
+    return _model_schema(model, unnest, tuple((rename or {}).items()))
+
+
+def flatten_dump(model: BaseModel) -> dict:
+    """
+    Dumps a model with nested models flattened in place, matching model_schema
+    """
+    row: dict = {}
+
+    for name, value in model:
+        if isinstance(value, BaseModel):
+            row.update(flatten_dump(value))
+        else:
+            row[name] = value
+
+    return row
+
+
+def frame_from_models(
+    models: Iterable[BaseModel], schema: pl.Schema, rename: dict | None = None
+) -> pl.DataFrame:
+    """
+    Builds a frame from validated models column by column with a static schema
+
+    Args:
+        models: Validated pydantic models
+        schema: Schema from model_schema
+        rename: Mapping of field names to output column names
+
+    Returns:
+        df
+    """
+    renames: dict = rename or {}
+    rows: list[dict] = [
+        {renames.get(key, key): value for key, value in flatten_dump(model).items()}
+        for model in models
+    ]
+
+    columns: dict = {name: [row[name] for row in rows] for name in schema}
+
+    return pl.DataFrame(columns, schema=schema)
@@ -0,0 +1,178 @@
+"""
+Module writing frames to a partitioned Parquet dataset on the local filesystem or S3.
+Every write adds new part files under Hive style ``column=value`` directories, so
+daily runs append to the dataset without rewriting what is already there.
+"""
+
+import io
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+from urllib.parse import quote
+
+import polars as pl
+from prefect import task
+from prefect.blocks.core import Block
+from prefect_aws import S3Bucket
+
+PARTITION_BY: tuple[str, ...] = ("as_of_date",)
+# Search results carry the searched region but no state, listings the reverse, so
+# each dataset is only partitioned by the columns its frames have
+DATASET_PARTITION_BY: dict[str, tuple[str, ...]] = {
+    "pricing": ("as_of_date", "region"),
+    "listings": ("as_of_date", "state"),
+}
+NULL_PARTITION: str = "__HIVE_DEFAULT_PARTITION__"
+
+
+def partition_value(value) -> str:
+    """
+    Formats a partition value as a path safe directory name
+    """
+    if value is None:
+        return NULL_PARTITION
+
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+
+    return quote(str(value), safe="")
+
+
+class ParquetSink:
+    """
+    Appends frames to a partitioned Parquet dataset
+
+    Args:
+        root: Local directory of the datasets, ignored when a bucket is given
+        bucket: S3 bucket block the datasets are written to
+        partition_by: Columns to partition by, in directory order. The columns of
+            the dataset in DATASET_PARTITION_BY, or just ``as_of_date``, if None.
+            Every column is always written so all part files of a dataset sit at
+            the same depth, ``as_of_date`` defaults to today and other missing
+            columns to the null partition
+        compression: Parquet compression codec
+        compression_level: Codec specific compression level
+        row_group_size: Rows per Parquet row group
+    """
+
+    def __init__(
+        self,
+        root: str | Path = "data",
+        bucket: S3Bucket | None = None,
+        partition_by: tuple[str, ...] | None = None,
+        compression: str = "zstd",
+        compression_level: int | None = None,
+        row_group_size: int | None = 128 * 1024,
+    ):
+        self.root = Path(root)
+        self.bucket = bucket
+        self.partition_by = partition_by
+        self.compression = compression
+        self.compression_level = compression_level
+        self.row_group_size = row_group_size
+
+    @classmethod
+    def from_output(cls, output: str, **kwargs) -> "ParquetSink":
+        """
+        Creates a sink from a local directory or an S3 bucket block slug
+
+        Args:
+            output: Directory path, or ``s3-bucket/<block name>`` to write to S3
+            **kwargs: Sink options
+
+        Returns:
+            sink
+        """
+        if output.startswith("s3-bucket/"):
+            return cls(bucket=Block.load(output), **kwargs)
+
+        return cls(root=output, **kwargs)
+
+    def _serialize(self, df: pl.DataFrame) -> io.BytesIO:
+        """
+        Writes a partition to an in memory Parquet file
+        """
+        buffer = io.BytesIO()
+        df.write_parquet(
+            buffer,
+            compression=self.compression,
+            compression_level=self.compression_level,
+            row_group_size=self.row_group_size,
+        )
+        buffer.seek(0)
+
+        return buffer
+
+    def _put(self, key: str, buffer: io.BytesIO) -> str:
+        """
+        Stores a part file and returns its location
+        """
+        if self.bucket is not None:
+            return self.bucket.upload_from_file_object(buffer, key)
+
+        path: Path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(buffer.getbuffer())
+
+        return str(path)
+
+    def write(self, df: pl.DataFrame, dataset: str) -> list[str]:
+        """
+        Appends a frame to a dataset, one new part file per partition
+
+        Args:
+            df: Frame to write
+            dataset: Name of the dataset directory
+
+        Returns:
+            paths: Location of every part file written
+        """
+        columns: list[str] = list(
+            self.partition_by or DATASET_PARTITION_BY.get(dataset, PARTITION_BY)
+        )
+
+        if "as_of_date" in columns and "as_of_date" not in df.columns:
+            df = df.with_columns(as_of_date=pl.lit(datetime.now(timezone.utc).date()))
+
+        df = df.with_columns(
+            pl.lit(None, dtype=pl.String).alias(column)
+            for column in columns
+            if column not in df.columns
+        )
+        part: str = (
+            f"part-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        )
+
+        partitions: dict[tuple, pl.DataFrame] = (
+            df.partition_by(columns, as_dict=True, include_key=False)
+            if columns
+            else {(): df}
+        )
+
+        paths: list[str] = []
+        for values, partition in partitions.items():
+            directories: list[str] = [
+                f"{column}={partition_value(value)}"
+                for column, value in zip(columns, values)
+            ]
+            key: str = "/".join([dataset, *directories, f"{part}.parquet"])
+
+            paths.append(self._put(key, self._serialize(partition)))
+
+        return paths
+
+
+@task(name="Write Parquet Partitions")
+def write_partitions(df: pl.DataFrame, dataset: str, output: str) -> list[str]:
+    """
+    Appends a frame to a partitioned Parquet dataset
+
+    Args:
+        df: Frame to write
+        dataset: Name of the dataset, e.g. ``pricing``
+        output: Directory path, or ``s3-bucket/<block name>`` to write to S3
+
+    Returns:
+        paths: Location of every part file written
+    """
+    return ParquetSink.from_output(output).write(df, dataset)
@@ -2,28 +2,43 @@
 Module for collecting listings from Zillow Sitemap
 """
 
+import zlib
+from typing import Iterable, Iterator
+from xml.etree import ElementTree
+
 import httpx
+import polars as pl
 from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 from prefect import task
 from prefect.tasks import exponential_backoff
+from prefecto.logging import get_prefect_or_default_logger
+
+from zillow.cache import response_cache
+from zillow.csrf import csrf_tokens, fetch_csrf_token_with_body
+from zillow.http import get_client
+from zillow.ids import timestamp_match_expr
+from zillow.mongo_models.sitemap_model import Property, validate_property_frame
+from zillow.ratelimit import rate_limiter
+from zillow.spool import PAYLOAD_RESULT_OPTIONS, SpoolHandle, resolve_bytes, spool
 
-from zillow.mongo_models.sitemap_model import Property, PropertySet
+GZIP_MAGIC: bytes = b"\x1f\x8b"
+STREAM_CHUNK_SIZE: int = 64 * 1024
 
 
 @task(name="Collects Sitemap partitions")
-def collect_sitemap_indexes(html_bytes: bytes) -> list:
+def collect_sitemap_indexes(html_bytes: bytes | SpoolHandle) -> list:
     """
     Parses HTML and converts partitions into a list
 
     Args:
-        html_bytes: Incoming sitemap directory html bytes
+        html_bytes: Incoming sitemap directory html bytes, or a handle to them
 
     Returns:
         sitemaps: list of sitemap urls
 
     """
-    soup = BeautifulSoup(html_bytes, "html.parser")
+    soup = BeautifulSoup(resolve_bytes(html_bytes), "html.parser")
 
     sitemaps = [
         url.strip()
@@ -35,77 +50,230 @@ def collect_sitemap_indexes(html_bytes: bytes) -> list:
     return sitemaps
 
 
-@task(name="Collects Sitemap Property URLs")
-def collect_property_urls(html_bytes: bytes) -> list[Property]:
+def _local_name(tag: str) -> str:
     """
-    Parses HTML and collects property URLs
+    Strips the XML namespace from an element tag
+    """
+    return tag.rpartition("}")[2]
+
+
+def iter_property_records(
+    xml_chunks: bytes | Iterable[bytes],
+) -> Iterator[dict]:
+    """
+    Incrementally parses a sitemap partition, yielding each record as its ``<url>``
+    element closes. Processed elements are cleared so memory stays constant no
+    matter the size of the partition.
 
     Args:
-        html_bytes: Incoming sitemap directory html bytes
+        xml_chunks: Sitemap bytes, either whole or as an iterable of chunks
 
-    Returns:
-        sitemaps: list of property urls
+    Yields:
+        record: dict with ``property_url`` and ``last_modified`` keys
+
+    Raises:
+        ElementTree.ParseError: If the incoming bytes are not well formed XML
+    """
+    if isinstance(xml_chunks, (bytes, bytearray, memoryview)):
+        xml_chunks = (xml_chunks,)
 
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    root: ElementTree.Element | None = None
+    started: bool = False
+
+    for chunk in xml_chunks:
+        if not started:
+            # The XML declaration must be the very first thing in the document
+            chunk = bytes(chunk).lstrip()
+            started = bool(chunk)
+
+        parser.feed(chunk)
+
+        for event, element in parser.read_events():
+            if root is None and event == "start":
+                root = element
+
+            if event != "end" or _local_name(element.tag) != "url":
+                continue
+
+            record: dict = {"property_url": None, "last_modified": None}
+            for child in element:
+                name: str = _local_name(child.tag)
+                if name == "loc":
+                    record["property_url"] = (child.text or "").strip()
+                elif name == "lastmod":
+                    record["last_modified"] = (child.text or "").strip()
+
+            yield record
+
+            root.clear()
+
+    parser.close()
+
+
+def _soup_property_records(html_bytes: bytes) -> list[dict]:
+    """
+    Parses property records by building the full BeautifulSoup tree
     """
     soup = BeautifulSoup(html_bytes, "html.parser")
 
-    parsed_prop_urls: list[dict] = [
+    return [
         {
             "property_url": item.find(name="loc").string.strip(),
             "last_modified": item.find(name="lastmod").string.strip(),
         }
         for item in soup.find_all(name="url")
     ]
-    property_set: PropertySet = PropertySet.model_validate(
-        parsed_prop_urls
-    )  # Using here mainly to validate parsed fields
 
-    return property_set.model_dump()
 
+@task(name="Collects Sitemap Property URLs")
+def collect_property_urls(
+    html_bytes: bytes | SpoolHandle, streaming: bool = True
+) -> list[Property]:
+    """
+    Parses HTML and collects property URLs
+
+    Args:
+        html_bytes: Incoming sitemap directory html bytes, or a handle to them
+        streaming: Parse incrementally without building a DOM, falling back to
+            BeautifulSoup if the document is not well formed XML
+
+    Returns:
+        sitemaps: list of property urls
 
-@task(
-    description="Geneerates a CSRF Token from the site",
-    retries=3,
-    retry_delay_seconds=exponential_backoff(3),
-    retry_jitter_factor=0.5,
-)
-def extract_csrf_token() -> str:
     """
-    Generates a new csrf token
+    html_bytes = resolve_bytes(html_bytes)
+
+    if streaming:
+        try:
+            parsed_prop_urls: list[dict] = list(iter_property_records(html_bytes))
+        except ElementTree.ParseError as exc:
+            logger = get_prefect_or_default_logger()
+            logger.warning(f"Streaming sitemap parse failed ({exc}), using soup")
+            parsed_prop_urls = _soup_property_records(html_bytes)
+    else:
+        parsed_prop_urls = _soup_property_records(html_bytes)
+
+    return _validate_records(parsed_prop_urls)
+
+
+def _validate_records(parsed_prop_urls: list[dict]) -> list[dict]:
     """
+    Validates parsed sitemap records, returning them in Property dump format. The
+    dump keeps the matched timestamp string, like the model, so impossible calendar
+    dates that parse to a null Datetime are stored as they were served
+    """
+    df: pl.DataFrame = validate_property_frame(parsed_prop_urls)
 
-    URL: str = "https://www.zillow.com/xml/indexes/us/hdp/for-sale-by-agent.xml.gz"
+    matched: pl.Series = pl.Series(
+        [record["last_modified"] for record in parsed_prop_urls], dtype=pl.String
+    )
 
-    headers = {"User-Agent": UserAgent().random}
+    return df.select(
+        id=pl.lit(None),
+        property_url="property_url",
+        last_modified=timestamp_match_expr(pl.lit(matched)),
+        zillow_id="zillow_id",
+    ).to_dicts()
 
-    response: httpx.Response = httpx.get(URL, headers=headers)
 
-    response.raise_for_status()
+def iter_gunzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Decompresses a gzip stream chunk by chunk. Zillow serves ``.xml.gz`` files both
+    as gzip bodies and with a gzip ``content-encoding`` (already decoded by httpx),
+    so the stream is only inflated when it starts with the gzip magic number.
+
+    Args:
+        chunks: Raw response chunks
+
+    Yields:
+        chunk: Decompressed bytes
+    """
+    chunks = iter(chunks)
+    decompressor = None
+    head: bytes = b""
+
+    for chunk in chunks:
+        if decompressor is None:
+            head += chunk
+            if len(head) < len(GZIP_MAGIC):
+                continue
 
-    csrf_token: str = response.headers["x-amz-cf-id"]
+            if not head.startswith(GZIP_MAGIC):
+                yield head
+                yield from chunks
+                return
 
-    return csrf_token
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            chunk, head = head, b""
+
+        yield decompressor.decompress(chunk)
+
+    if decompressor is None:
+        if head:
+            yield head
+        return
+
+    yield decompressor.flush()
+
+
+def stream_property_records(site_map_url: str) -> Iterator[dict]:
+    """
+    Streams a sitemap partition, inflating and parsing it as it downloads so only a
+    bounded buffer of the file is ever held in memory
+
+    Args:
+        site_map_url: URL of the sitemap partition
+
+    Yields:
+        record: dict with ``property_url`` and ``last_modified`` keys
+    """
+    rate_limiter.acquire("sitemap")
+
+    headers = {"User-Agent": UserAgent().random}
+
+    with get_client().stream("GET", site_map_url, headers=headers) as response:
+        response.raise_for_status()
+
+        yield from iter_property_records(
+            iter_gunzipped(response.iter_bytes(STREAM_CHUNK_SIZE))
+        )
 
 
 @task(
-    description="Collects URLs from home detail site",
+    description="Geneerates a CSRF Token from the site",
     retries=3,
     retry_delay_seconds=exponential_backoff(3),
     retry_jitter_factor=0.5,
 )
-def extract_sitemap_dir_urls() -> bytes:
+def extract_csrf_token() -> str:
     """
-    Extracts property URLs from the ZIllow sitemap
+    Returns the cached csrf token, fetching a new one if it expired
     """
-    URL: str = "https://www.zillow.com/xml/indexes/us/hdp/for-sale-by-agent.xml.gz"
+    return csrf_tokens.get()
 
-    headers = {"User-Agent": UserAgent().random}
 
-    response: httpx.Response = httpx.get(URL, headers=headers)
+@task(
+    description="Collects URLs from home detail site",
+    retries=3,
+    retry_delay_seconds=exponential_backoff(3),
+    retry_jitter_factor=0.5,
+    **PAYLOAD_RESULT_OPTIONS,
+)
+def extract_sitemap_dir_urls(spooled: bool = False) -> bytes | SpoolHandle:
+    """
+    Extracts property URLs from the ZIllow sitemap. The csrf token on the response
+    is cached so the flow does not request it again.
+
+    Args:
+        spooled: Return a handle to the spooled index instead of its bytes
+    """
+    csrf_token, content = fetch_csrf_token_with_body()
 
-    response.raise_for_status()
+    if csrf_token is not None:
+        csrf_tokens.seed(csrf_token)
 
-    return response.content
+    return spool.put(content) if spooled else content
 
 
 @task(
@@ -113,19 +281,27 @@ def extract_sitemap_dir_urls() -> bytes:
     retries=3,
     retry_delay_seconds=exponential_backoff(3),
     retry_jitter_factor=0.5,
+    **PAYLOAD_RESULT_OPTIONS,
 )
-def extract_sitemap_urls(site_map_url: str) -> bytes:
+def extract_sitemap_urls(
+    site_map_url: str, spooled: bool = False
+) -> bytes | SpoolHandle:
     """
     Extracts property URLs from the ZIllow sitemap
+
+    Args:
+        site_map_url: URL of the sitemap partition
+        spooled: Return a handle to the spooled partition instead of its bytes
     """
+    rate_limiter.acquire("sitemap")
 
     headers = {"User-Agent": UserAgent().random}
 
-    response: httpx.Response = httpx.get(site_map_url, headers=headers)
+    response: httpx.Response = get_client().get(site_map_url, headers=headers)
 
     response.raise_for_status()
 
-    return response.content
+    return spool.put(response.content) if spooled else response.content
 
 
 @task(
@@ -133,16 +309,62 @@ def extract_sitemap_urls(site_map_url: str) -> bytes:
     retries=3,
     retry_delay_seconds=exponential_backoff(5),
     retry_jitter_factor=0.5,
+    **PAYLOAD_RESULT_OPTIONS,
 )
-def extract_listing_url(property_url: str, csrf_token: str) -> bytes:
+def extract_listing_url(
+    property_url: str, csrf_token: str, spooled: bool = False
+) -> bytes | SpoolHandle:
     """
-    Extracts property URLs from the ZIllow sitemap
+    Extracts property URLs from the ZIllow sitemap, served from the response cache
+    when the listing was fetched recently
+
+    Args:
+        property_url: URL of the listing
+        csrf_token: Token for use across each worker node
+        spooled: Return a handle to the spooled page instead of its bytes
     """
+    cached: bytes | None = response_cache.get(property_url)
+    if cached is not None:
+        return spool.put(cached) if spooled else cached
 
     headers = {"User-Agent": UserAgent().random, "csrfToken": csrf_token}
 
-    response: httpx.Response = httpx.Client().get(property_url, headers=headers)
+    response: httpx.Response = get_client().get(property_url, headers=headers)
 
     response.raise_for_status()
 
-    return response.content
+    response_cache.put(property_url, response.content)
+
+    return spool.put(response.content) if spooled else response.content
+
+
+@task(
+    description="Streams and parses property URLs from a sitemap partition",
+    retries=3,
+    retry_delay_seconds=exponential_backoff(3),
+    retry_jitter_factor=0.5,
+)
+def extract_property_urls(site_map_url: str) -> list[Property]:
+    """
+    Downloads, decompresses and parses a sitemap partition in a single pass. Falls
+    back to a buffered download parsed with BeautifulSoup if the partition is not
+    well formed XML.
+
+    Args:
+        site_map_url: URL of the sitemap partition
+
+    Returns:
+        properties: list of property urls
+    """
+    try:
+        parsed_prop_urls: list[dict] = list(stream_property_records(site_map_url))
+    except ElementTree.ParseError as exc:
+        logger = get_prefect_or_default_logger()
+        logger.warning(f"Streaming sitemap parse failed ({exc}), using soup")
+
+        html_bytes: bytes = b"".join(
+            iter_gunzipped([extract_sitemap_urls.fn(site_map_url)])
+        )
+        parsed_prop_urls = _soup_property_records(html_bytes)
+
+    return _validate_records(parsed_prop_urls)
@@ -0,0 +1,143 @@
+"""
+Module spooling raw payloads to local disk so tasks hand each other a small handle
+instead of page bytes or response JSON. Prefect only ever sees the handle, keeping
+task results and their storage proportional to the records, not the raw pages.
+"""
+
+import atexit
+import shutil
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+import orjson
+from pydantic import BaseModel, Field
+
+# Options of tasks returning raw payloads, their results are never written to storage
+PAYLOAD_RESULT_OPTIONS: dict = {"persist_result": False}
+
+
+class SpoolHandle(BaseModel):
+    """
+    Reference to a spooled payload
+    """
+
+    key: str = Field(
+        name="Key", description="Unique key of the payload", examples=["3f2a9c"]
+    )
+    size: int = Field(name="Size", description="Payload size in bytes", examples=[2048])
+
+    def read(self) -> bytes:
+        """
+        Reads the payload from the shared spool
+        """
+        return spool.get(self.key)
+
+    def read_json(self) -> dict:
+        """
+        Reads and decodes a spooled JSON payload
+        """
+        return orjson.loads(self.read())
+
+
+class Spool:
+    """
+    Payload store on local disk, every put gets its own key so consumers can discard
+    their payload without affecting identical ones
+
+    Args:
+        root: Directory of the spool, a temporary directory removed at exit if None
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        self._lock = threading.Lock()
+        self._root = Path(root) if root is not None else None
+        self._temporary: str | None = None
+
+    @property
+    def root(self) -> Path:
+        """
+        Directory of the spool, created on first use
+        """
+        with self._lock:
+            if self._root is None:
+                self._temporary = tempfile.mkdtemp(prefix="zillow-spool-")
+                self._root = Path(self._temporary)
+
+            return self._root
+
+    def configure(self, root: str | Path | None = None):
+        """
+        Points the spool at a directory shared by the workers, a temporary directory
+        if None
+        """
+        self.clear()
+
+        with self._lock:
+            self._root = Path(root) if root is not None else None
+
+    def _path(self, key: str) -> Path:
+        """
+        Path of a payload
+        """
+        return self.root / key[:2] / key
+
+    def put(self, content: bytes) -> SpoolHandle:
+        """
+        Spools a payload
+
+        Args:
+            content: Raw payload
+
+        Returns:
+            handle: Reference to the payload
+        """
+        key: str = uuid.uuid4().hex
+        path: Path = self._path(key)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+        return SpoolHandle(key=key, size=len(content))
+
+    def get(self, key: str) -> bytes:
+        """
+        Reads a spooled payload
+        """
+        return self._path(key).read_bytes()
+
+    def discard(self, handle: SpoolHandle):
+        """
+        Removes a payload once every consumer has read it
+        """
+        self._path(handle.key).unlink(missing_ok=True)
+
+    def clear(self):
+        """
+        Removes the temporary spool directory
+        """
+        with self._lock:
+            if self._temporary is not None:
+                shutil.rmtree(self._temporary, ignore_errors=True)
+                self._temporary = None
+                self._root = None
+
+
+def resolve_bytes(payload: bytes | SpoolHandle) -> bytes:
+    """
+    Returns a raw payload passed directly or by handle
+    """
+    return payload.read() if isinstance(payload, SpoolHandle) else payload
+
+
+def resolve_json(payload: dict | SpoolHandle) -> dict:
+    """
+    Returns a JSON payload passed directly or by handle
+    """
+    return payload.read_json() if isinstance(payload, SpoolHandle) else payload
+
+
+spool = Spool()
+
+atexit.register(spool.clear)
@@ -6,6 +6,8 @@ import pytest
 from bs4 import BeautifulSoup
 from pytest import FixtureRequest
 
+from zillow.csrf import csrf_tokens
+
 
 @pytest.fixture
 def grab_html(asset_folder, request: FixtureRequest) -> bytes:
@@ -33,3 +35,13 @@ def grab_parquet(asset_folder, request: FixtureRequest) -> dict:
     path: Path = asset_folder / "transform" / request.param
 
     return pl.read_parquet(path)
+
+
+@pytest.fixture(autouse=True)
+def clear_csrf_token():
+    """
+    Every test fetches its own csrf token
+    """
+    csrf_tokens.clear()
+    yield
+    csrf_tokens.clear()
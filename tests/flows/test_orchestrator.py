@@ -9,6 +9,7 @@ from pytest import MonkeyPatch
 
 from flows.attributes import queue_listings_attributes
 from flows.utility import return_recently_modified
+from zillow.individual_property.transform.listing import PROPERTY_SCHEMA
 
 
 @pytest.fixture
@@ -130,7 +131,9 @@ def mock_sitemap_results():
     return results
 
 
+@pytest.mark.parametrize("chunk_size", [1, 1000])
 def test_return_recently_modified(
+    chunk_size,
     prefect_test_fixture,
     populate_prefect_blocks,
     mock_sitemap_results,
@@ -143,7 +146,9 @@ def test_return_recently_modified(
     """
     monkeypatch.setattr("flows.utility.blocks.mongodb.get_client", lambda: mock_db)
 
-    new_or_recently_modified = return_recently_modified.fn(mock_sitemap_results)
+    new_or_recently_modified = return_recently_modified.fn(
+        mock_sitemap_results, chunk_size=chunk_size
+    )
 
     assert new_or_recently_modified.to_dicts() == [
         {
@@ -205,6 +210,22 @@ def test_orchestrator(
         return_value=Response(204, content=grab_html)
     )
 
+    monkeypatch.setattr("flows.utility.blocks.mongodb.get_client", lambda: mock_db)
+
     df: pl.DataFrame = queue_listings_attributes().unique()
 
-    assert_frame_equal(df, grab_parquet)
+    assert_frame_equal(df, grab_parquet.cast(PROPERTY_SCHEMA))
+
+    # Every page is a listing outside the sitemap, so no queued record was collected
+    # and the stored documents are left for the next diff
+    stored: dict[str, str] = {
+        document["zillow_id"]: document["last_modified"]
+        for document in mock_db["production"]["product_zillow"].find(
+            {
+                "zillow_id": {
+                    "$in": ["2146995561", "2146955997", "2146954801", "2146954389"]
+                }
+            }
+        )
+    }
+    assert stored == {"2146995561": "2024-08-13T04:19:00Z"}
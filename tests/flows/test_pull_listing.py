@@ -10,7 +10,8 @@ from httpx import Headers, Response
 from polars.testing import assert_frame_equal
 from pytest import MonkeyPatch
 
-from flows.pull_listing import query_zillow_listings
+from flows.pull_listing import listing_fused_collection, query_zillow_listings
+from zillow.individual_property.transform.listing import PROPERTY_SCHEMA
 
 
 @pytest.mark.parametrize(
@@ -18,8 +19,10 @@ from flows.pull_listing import query_zillow_listings
     [("listing.html", "property.parquet")],
     indirect=True,
 )
+@pytest.mark.parametrize("engine", ["async", "fused", "tasks"])
 @respx.mock(base_url="www.zillow.com")
 def test_query_zillow_listings(
+    engine,
     grab_html,
     grab_parquet,
     prefect_test_fixture,
@@ -40,7 +43,7 @@ def test_query_zillow_listings(
         }
     )
 
-    respx_mock.get(
+    respx_mock.head(
         "https://www.zillow.com/xml/indexes/us/hdp/for-sale-by-agent.xml.gz"
     ).mock(return_value=Response(204, headers=headers))
 
@@ -50,6 +53,59 @@ def test_query_zillow_listings(
 
     monkeypatch.setattr(random, "randint", lambda x, y: 1)
 
-    df = query_zillow_listings(property_urls)
+    df = query_zillow_listings(property_urls, engine=engine)
 
-    assert_frame_equal(df, grab_parquet)
+    assert_frame_equal(df, grab_parquet.cast(PROPERTY_SCHEMA))
+
+
+@pytest.mark.parametrize(
+    "grab_html",
+    ["listing.html"],
+    indirect=True,
+)
+@respx.mock(base_url="www.zillow.com")
+def test_listing_fused_collection(
+    grab_html,
+    prefect_test_fixture,
+    respx_mock: respx.MockRouter,
+    caplog: pytest.LogCaptureFixture,
+):
+    """
+    One fused task run collects the batch and skips listings that fail, only a
+    rejected token is refreshed
+    """
+    good: str = "https://www.zillow.com/homedetails/2146995561_zpid/"
+    missing: str = "https://www.zillow.com/homedetails/2146985037_zpid/"
+    forbidden: str = "https://www.zillow.com/homedetails/2146994027_zpid/"
+    broken: str = "https://www.zillow.com/homedetails/2146997656_zpid/"
+
+    token_route = respx_mock.head(
+        "https://www.zillow.com/xml/indexes/us/hdp/for-sale-by-agent.xml.gz"
+    ).mock(return_value=Response(204, headers={"x-amz-cf-id": "fresh"}))
+    respx_mock.get(good).mock(return_value=Response(200, content=grab_html))
+    missing_route = respx_mock.get(missing).mock(return_value=Response(404))
+    forbidden_route = respx_mock.get(forbidden).mock(
+        side_effect=lambda request: Response(
+            403 if request.headers["csrfToken"] == "stale" else 200, content=grab_html
+        )
+    )
+    broken_route = respx_mock.get(broken).mock(
+        return_value=Response(200, content=b"<html/>")
+    )
+
+    df = listing_fused_collection(
+        [
+            {"property_url": url, "last_modified": "2024-08-14T14:53:00Z"}
+            for url in [missing, good, broken, forbidden]
+        ],
+        "stale",
+    )
+
+    assert df.height == 2
+    assert df.schema == PROPERTY_SCHEMA
+    assert missing_route.call_count == 2
+    assert missing_route.calls.last.request.headers["csrfToken"] == "stale"
+    assert broken_route.call_count == 1
+    assert forbidden_route.call_count == 2
+    assert token_route.call_count == 1
+    assert "Failed to collect zpid 2146985037" in caplog.text
@@ -0,0 +1,205 @@
+import logging
+
+import orjson
+import polars as pl
+import pytest
+import respx
+from httpx import Response
+from pytest import MonkeyPatch
+
+from flows.queryset import query_zillow_region_set, query_zillow_regions
+from zillow.mongo_models.query_config import RegionConfig
+from zillow.ratelimit import rate_limiter
+
+
+def region(search_term: str) -> RegionConfig:
+    return RegionConfig.model_validate(
+        {
+            "mapBounds": {
+                "west": -118.668176,
+                "east": -118.155289,
+                "south": 33.703652,
+                "north": 34.337306,
+            },
+            "usersSearchTerm": search_term,
+            "regionSelection": [{"regionId": 12447, "regionType": 6}],
+            "filterState": {"sortSelection": {"value": "globalrelevanceex"}},
+        }
+    )
+
+
+def search_page(
+    grab_json: dict, page: int, total_pages: int, total_results: int, offset: int = 0
+) -> dict:
+    """
+    Search response whose zpids are unique per page and offset
+    """
+    results: list[dict] = [
+        {**result, "zpid": offset + page * 1000 + i}
+        for i, result in enumerate(grab_json["cat1"]["searchResults"]["listResults"])
+    ]
+
+    return {
+        "cat1": {
+            "searchList": {
+                "totalPages": total_pages,
+                "totalResultCount": total_results,
+                "resultsPerPage": len(results),
+            },
+            "searchResults": {"listResults": results},
+        }
+    }
+
+
+@pytest.fixture
+def search_route(respx_mock: respx.MockRouter, monkeypatch: MonkeyPatch):
+    """
+    Mocks the csrf token and disables the search budget
+    """
+    monkeypatch.setattr(rate_limiter, "budgets", {})
+
+    respx_mock.head(
+        "https://www.zillow.com/xml/indexes/us/hdp/for-sale-by-agent.xml.gz"
+    ).mock(return_value=Response(200, headers={"x-amz-cf-id": "token"}))
+
+    return respx_mock.put("https://www.zillow.com/async-create-search-page-state")
+
+
+@pytest.mark.parametrize("grab_json", ["first_page.json"], indirect=True)
+def test_query_zillow_region_set(grab_json: dict, prefect_test_fixture, search_route):
+    """
+    Every page of every region is requested once and tagged with its region
+    """
+
+    def respond(request) -> Response:
+        query: dict = orjson.loads(request.read())["searchQueryState"]
+        page: int = query["pagination"]["currentPage"]
+
+        if query["usersSearchTerm"] == "Small, CA":
+            return Response(200, json=search_page(grab_json, page, 1, 10))
+        return Response(200, json=search_page(grab_json, page, 3, 100))
+
+    search_route.mock(side_effect=respond)
+
+    df: pl.DataFrame = query_zillow_region_set([region("Small, CA"), region("LA")])
+
+    page_rows: int = len(grab_json["cat1"]["searchResults"]["listResults"])
+
+    assert search_route.call_count == 4
+    assert df.get_column("region").value_counts(sort=True).rows() == [
+        ("LA", 3 * page_rows),
+        ("Small, CA", page_rows),
+    ]
+    assert df.get_column("region").head(page_rows).unique().to_list() == ["LA"]
+
+
+@pytest.mark.parametrize("grab_json", ["first_page.json"], indirect=True)
+def test_query_zillow_region_set_tiles(
+    grab_json: dict, prefect_test_fixture, search_route
+):
+    """
+    Regions over the page cap are split into quadrants and duplicates dropped
+    """
+    root = region("LA")
+
+    def respond(request) -> Response:
+        query: dict = orjson.loads(request.read())["searchQueryState"]
+        page: int = query["pagination"]["currentPage"]
+
+        if query["mapBounds"] == root.mapBounds.model_dump():
+            return Response(200, json=search_page(grab_json, page, 3, 10_000))
+
+        # First pages overlap, as do later pages of tiles sharing a west edge
+        offset: int = 0 if page == 1 else round(query["mapBounds"]["west"] * 1e6)
+        return Response(200, json=search_page(grab_json, page, 2, 50, offset))
+
+    search_route.mock(side_effect=respond)
+
+    df: pl.DataFrame = query_zillow_region_set([root], page_cap=20)
+
+    page_rows: int = len(grab_json["cat1"]["searchResults"]["listResults"])
+
+    assert search_route.call_count == 1 + 4 * 2
+    assert df.height == page_rows + 2 * page_rows
+    assert df.get_column("zpid").is_unique().all()
+
+
+@pytest.mark.parametrize("grab_json", ["first_page.json"], indirect=True)
+def test_query_zillow_region_set_max_depth(
+    grab_json: dict, prefect_test_fixture, search_route, caplog
+):
+    """
+    Tiles still over the page cap at max depth are kept and logged with their
+    bounds and result count
+    """
+    root = region("LA")
+
+    def respond(request) -> Response:
+        page: int = orjson.loads(request.read())["searchQueryState"]["pagination"][
+            "currentPage"
+        ]
+        return Response(200, json=search_page(grab_json, page, 2, 10_000))
+
+    search_route.mock(side_effect=respond)
+
+    with caplog.at_level(logging.WARNING):
+        query_zillow_region_set([root], page_cap=1, max_depth=1)
+
+    warnings: list[str] = [
+        record.getMessage()
+        for record in caplog.records
+        if record.levelno == logging.WARNING
+    ]
+
+    assert search_route.call_count == 1 + 4 * 2
+    assert len(warnings) == 4
+    assert all("10000 results" in warning for warning in warnings)
+    assert any(
+        str(quadrant.model_dump()) in warnings[0]
+        for quadrant in root.mapBounds.quadrants()
+    )
+
+
+def test_quadrants():
+    """
+    Quadrants cover the bounds exactly
+    """
+    bounds = region("LA").mapBounds
+    quadrants = bounds.quadrants()
+
+    assert min(q.west for q in quadrants) == bounds.west
+    assert max(q.east for q in quadrants) == bounds.east
+    assert min(q.south for q in quadrants) == bounds.south
+    assert max(q.north for q in quadrants) == bounds.north
+    assert quadrants[0].east == quadrants[1].west
+    assert quadrants[0].south == quadrants[2].north
+
+
+@pytest.mark.parametrize("grab_json", ["first_page.json"], indirect=True)
+def test_query_zillow_regions_output(
+    grab_json: dict, prefect_test_fixture, search_route, tmp_path
+):
+    """
+    Single region output shares the partition layout of the region set
+    """
+    search_route.mock(
+        side_effect=lambda request: Response(
+            200,
+            json=search_page(
+                grab_json,
+                orjson.loads(request.read())["searchQueryState"]["pagination"][
+                    "currentPage"
+                ],
+                2,
+                50,
+            ),
+        )
+    )
+
+    query_zillow_regions(region("LA"), output=str(tmp_path))
+
+    df: pl.DataFrame = pl.scan_parquet(
+        tmp_path / "pricing" / "**" / "*.parquet", hive_partitioning=True
+    ).collect()
+
+    assert df.get_column("region").unique().to_list() == ["LA"]
@@ -0,0 +1,147 @@
+"""
+Tests the async listing engine
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+import pytest
+import respx
+from httpx import Response
+from polars.testing import assert_frame_equal
+
+from zillow.adaptive import THROTTLE_STATUS_CODES
+from zillow.csrf import CsrfTokenProvider
+from zillow.individual_property import parse_stage
+from zillow.individual_property.extract.engine import ListingFetcher
+from zillow.individual_property.parse_stage import ParseStage, parse_listing_batch
+from zillow.individual_property.transform.listing import PROPERTY_SCHEMA
+from zillow.ratelimit import RateLimiter
+
+
+class TestListingFetcher:
+
+    @pytest.mark.parametrize("grab_html", ["listing.html"], indirect=True)
+    def test_retries(self, grab_html: bytes, respx_mock: respx.MockRouter):
+        """
+        Failed fetches are retried then returned as failures, not raised
+        """
+        good: str = "https://www.zillow.com/homedetails/2146995561_zpid/"
+        bad: str = "https://www.zillow.com/homedetails/2146994027_zpid/"
+
+        respx_mock.get(good).mock(return_value=Response(200, content=grab_html))
+        bad_route = respx_mock.get(bad).mock(return_value=Response(500))
+
+        fetcher = ListingFetcher(concurrency=2, retries=1, retry_delay=0)
+        df, failures = fetcher.run_frame(
+            [good, bad, good], "token", ParseStage(executor=ThreadPoolExecutor())
+        )
+
+        assert df.height == 2
+        assert "HTTPStatusError" in failures[bad]
+        assert bad_route.call_count == 2
+
+    @pytest.mark.parametrize("grab_html", ["listing.html"], indirect=True)
+    @pytest.mark.parametrize("status_code", sorted(THROTTLE_STATUS_CODES))
+    def test_refresh_on_throttle(
+        self, grab_html: bytes, respx_mock: respx.MockRouter, status_code: int
+    ):
+        """
+        A token rejected with any throttle status is refreshed once and the retries
+        use the new token
+        """
+        urls: list[str] = [
+            "https://www.zillow.com/homedetails/2146995561_zpid/",
+            "https://www.zillow.com/homedetails/2146994027_zpid/",
+        ]
+
+        def respond(request) -> Response:
+            if request.headers["csrfToken"] == "stale":
+                return Response(status_code)
+            return Response(200, content=grab_html)
+
+        route = respx_mock.get(url__startswith="https://www.zillow.com/homedetails/")
+        route.mock(side_effect=respond)
+
+        fetched: list[str] = []
+        tokens = CsrfTokenProvider(fetch=lambda: fetched.append("fresh") or "fresh")
+
+        fetcher = ListingFetcher(concurrency=2, retries=1, retry_delay=0, tokens=tokens)
+        df, failures = fetcher.run_frame(
+            urls, "stale", ParseStage(executor=ThreadPoolExecutor())
+        )
+
+        assert (df.height, failures) == (2, {})
+        assert fetched == ["fresh"]
+        assert route.call_count == 4
+
+    def test_backpressure(self, respx_mock: respx.MockRouter, monkeypatch):
+        """
+        A slow stage holds back the fetchers, pages fetched but not yet parsed stay
+        bounded by the concurrency plus the pages the stage may hold
+        """
+        concurrency, batch_size, max_pending = 5, 5, 1
+        counts: dict[str, int] = {"fetched": 0, "parsed": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def respond(request) -> Response:
+            with lock:
+                counts["fetched"] += 1
+                counts["peak"] = max(
+                    counts["peak"], counts["fetched"] - counts["parsed"]
+                )
+            return Response(200, content=b"<html/>")
+
+        def slow_parse(pages: list) -> tuple[bytes, dict]:
+            time.sleep(0.01)
+            with lock:
+                counts["parsed"] += len(pages)
+            return parse_listing_batch(pages)
+
+        monkeypatch.setattr(parse_stage, "parse_listing_batch", slow_parse)
+        respx_mock.get(url__startswith="https://www.zillow.com/homedetails/").mock(
+            side_effect=respond
+        )
+
+        fetcher = ListingFetcher(
+            concurrency=concurrency, adaptive=None, limiter=RateLimiter({}), retries=0
+        )
+        with ThreadPoolExecutor(1) as executor:
+            _, failures = fetcher.run_frame(
+                [f"https://www.zillow.com/homedetails/{i}_zpid/" for i in range(200)],
+                "token",
+                ParseStage(batch_size, max_pending, executor),
+            )
+
+        assert len(failures) == 200
+        assert counts["parsed"] == 200
+        assert counts["peak"] <= concurrency + batch_size * max_pending
+
+    @pytest.mark.parametrize(
+        "grab_html, grab_parquet",
+        [("listing.html", "property.parquet")],
+        indirect=True,
+    )
+    def test_run_frame(
+        self, grab_html: bytes, grab_parquet: pl.DataFrame, respx_mock: respx.MockRouter
+    ):
+        """
+        The process pool stage returns one frame and failures by URL
+        """
+        good: str = "https://www.zillow.com/homedetails/2146995561_zpid/"
+        broken: str = "https://www.zillow.com/homedetails/2146994027_zpid/"
+        missing: str = "https://www.zillow.com/homedetails/2146985037_zpid/"
+
+        respx_mock.get(good).mock(return_value=Response(200, content=grab_html))
+        respx_mock.get(broken).mock(return_value=Response(200, content=b"<html/>"))
+        respx_mock.get(missing).mock(return_value=Response(404))
+
+        fetcher = ListingFetcher(concurrency=2, retries=0)
+        df, failures = fetcher.run_frame(
+            [good, broken, missing, good], "token", ParseStage(batch_size=2)
+        )
+
+        assert_frame_equal(df, pl.concat([grab_parquet.cast(PROPERTY_SCHEMA)] * 2))
+        assert sorted(failures) == sorted([broken, missing])
@@ -4,7 +4,13 @@ Module to test extracting json from listings
 
 import pytest
 
-from zillow.individual_property.extract.listing import collect_listing_attrs
+from zillow.individual_property.extract.listing import (
+    collect_listing_attrs,
+    load_client_cache,
+    load_next_data,
+    scan_client_cache,
+    scan_next_data,
+)
 
 
 class TestListings:
@@ -16,6 +22,46 @@ class TestListings:
         ],
         indirect=True,
     )
-    def test_collect_listing_attrs(self, grab_html: bytes, grab_json: dict):
-        results: dict = collect_listing_attrs.fn(grab_html)
+    @pytest.mark.parametrize("fast", [True, False])
+    def test_collect_listing_attrs(self, grab_html: bytes, grab_json: dict, fast):
+        results: dict = collect_listing_attrs.fn(grab_html, fast)
         assert results == grab_json
+
+    @pytest.mark.parametrize("grab_html", [("listing.html")], indirect=True)
+    def test_load_next_data(self, grab_html: bytes):
+        """
+        The byte scanner decodes the same payload as the soup parser
+        """
+        assert isinstance(scan_next_data(grab_html), memoryview)
+        assert load_next_data(grab_html) == load_next_data(grab_html, fast=False)
+
+    @pytest.mark.parametrize("grab_html", [("listing.html")], indirect=True)
+    def test_load_client_cache(self, grab_html: bytes):
+        """
+        Decoding only the cache string matches decoding the whole page json
+        """
+        assert isinstance(scan_client_cache(grab_html), memoryview)
+        assert load_client_cache(grab_html) == load_client_cache(grab_html, False)
+
+    @pytest.mark.parametrize(
+        "grab_html, grab_json",
+        [
+            ("listing.html", "listing.json"),
+        ],
+        indirect=True,
+    )
+    def test_collect_listing_attrs_keys(self, grab_html: bytes, grab_json: dict):
+        """
+        Only the declared keys are returned
+        """
+        results: dict = collect_listing_attrs.fn(grab_html, keys=["property"])
+
+        assert results == {"property": grab_json["property"]}
+
+    def test_scan_next_data_missing(self):
+        """
+        Pages without the script are left to the fallback
+        """
+        html_bytes: bytes = b'<html><div id="__NEXT_DATA__"></div></html>'
+
+        assert scan_next_data(html_bytes) is None
@@ -0,0 +1,65 @@
+"""
+Tests the process pool parse stage
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from zillow.individual_property.parse_stage import ParseStage, parse_listing_batch
+from zillow.individual_property.transform.listing import PROPERTY_SCHEMA
+
+GOOD: str = "https://www.zillow.com/homedetails/2146993218_zpid/"
+INVALID: str = "https://www.zillow.com/homedetails/1_zpid/"
+BROKEN: str = "https://www.zillow.com/homedetails/2_zpid/"
+
+
+def invalid_page(html_bytes: bytes) -> bytes:
+    """
+    Listing page whose property fails model validation
+    """
+    return html_bytes.replace(
+        b'\\"county\\":\\"Fulton County\\"', b'\\"county\\":null', 1
+    )
+
+
+@pytest.mark.parametrize(
+    "grab_html, grab_parquet",
+    [("listing.html", "property.parquet")],
+    indirect=True,
+)
+def test_parse_listing_batch(grab_html: bytes, grab_parquet: pl.DataFrame):
+    """
+    A listing failing extraction or validation is recorded, the rest still parse
+    """
+    ipc, failures = parse_listing_batch(
+        [(GOOD, grab_html), (INVALID, invalid_page(grab_html)), (BROKEN, b"<html/>")]
+    )
+
+    assert_frame_equal(pl.read_ipc_stream(ipc), grab_parquet.cast(PROPERTY_SCHEMA))
+    assert sorted(failures) == sorted([INVALID, BROKEN])
+    assert "county" in failures[INVALID]
+
+
+@pytest.mark.parametrize("grab_html", ["listing.html"], indirect=True)
+def test_parse_stage(grab_html: bytes):
+    """
+    Batches are parsed on the executor with at most one batch in flight
+    """
+
+    async def run() -> tuple[pl.DataFrame, dict]:
+        with ThreadPoolExecutor(2) as executor:
+            stage = ParseStage(batch_size=2, max_pending=1, executor=executor)
+            for index in range(5):
+                await stage.parse(f"{GOOD}{index}", grab_html)
+            await stage.parse(INVALID, invalid_page(grab_html))
+
+            return await stage.close()
+
+    df, failures = asyncio.run(run())
+
+    assert df.height == 5
+    assert list(failures) == [INVALID]
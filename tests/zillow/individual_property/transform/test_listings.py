@@ -1,7 +1,12 @@
+import polars as pl
 import pytest
 from polars.testing import assert_frame_equal
 
-from zillow.individual_property.transform.listing import property_json_to_df
+from zillow.individual_property.transform.listing import (
+    PROPERTY_SCHEMA,
+    property_json_to_df,
+    property_jsons_to_df,
+)
 
 
 @pytest.mark.parametrize(
@@ -14,4 +19,19 @@ def test_property_json_to_df(grab_json, grab_parquet):
     Tests json to df transform
     """
     results = property_json_to_df.fn(grab_json)
-    assert_frame_equal(results, grab_parquet)
+    assert_frame_equal(results, grab_parquet.cast(PROPERTY_SCHEMA))
+
+
+@pytest.mark.parametrize(
+    "grab_json, grab_parquet",
+    [("listing.json", "property.parquet")],
+    indirect=True,
+)
+def test_property_jsons_to_df(grab_json, grab_parquet):
+    """
+    Tests a batch of jsons becomes one frame with the declared schema
+    """
+    results = property_jsons_to_df.fn([grab_json, grab_json])
+
+    assert results.schema == PROPERTY_SCHEMA
+    assert_frame_equal(results, pl.concat([grab_parquet] * 2).cast(PROPERTY_SCHEMA))
@@ -2,9 +2,18 @@
 Module for testing mongo db property configs
 """
 
+import logging
+
+import polars as pl
 import pytest
+from mongomock import MongoClient
 
-from zillow.mongo_models.sitemap_model import Property, ZillowRepository
+from zillow.mongo_models.sitemap_model import (
+    Property,
+    UpsertCounts,
+    ZillowRepository,
+    validate_property_frame,
+)
 
 
 class TestProperty:
@@ -50,6 +59,116 @@ class TestProperty:
 
         assert property.zillow_id == expected_zid
 
+    def test_validate_property_frame(self, property_set):
+        """
+        Vectorized validation matches the model output
+        """
+        records: list[dict] = [
+            {"property_url": prop.property_url, "last_modified": prop.last_modified}
+            for prop in property_set
+        ]
+
+        df: pl.DataFrame = validate_property_frame(records)
+
+        assert df.schema["last_modified"] == pl.Datetime("us", "UTC")
+        assert df["zillow_id"].to_list() == [prop.zillow_id for prop in property_set]
+        assert df["last_modified"].dt.strftime("%Y-%m-%dT%H:%M:%SZ").to_list() == [
+            prop.last_modified for prop in property_set
+        ]
+
+    def test_validate_property_frame_calendar(self):
+        """
+        Impossible calendar dates pass both validators, only the pattern is checked,
+        and parse to a null Datetime
+        """
+        record: dict = {
+            "property_url": "https://www.zillow.com/homedetails/2146994027_zpid/",
+            "last_modified": "2024-02-31T14:53:00Z",
+        }
+
+        assert Property.model_validate(record).last_modified == "2024-02-31T14:53:00Z"
+        assert validate_property_frame([record])["last_modified"].to_list() == [None]
+
+    @pytest.mark.parametrize(
+        "property_url, is_valid",
+        [
+            ("https://www.zillow.com:99999/homedetails/1_zpid/", False),
+            ("https://www.zillow.com:8a/homedetails/1_zpid/", False),
+            ("https://www.zillow.com:0065535/homedetails/1_zpid/", True),
+            ("https://www.zillow.com:/homedetails/1_zpid/", True),
+            ("https://www.zillow.com\\homedetails/1_zpid/", True),
+            ("https://user@www.zillow.com/homedetails/1_zpid/", True),
+        ],
+    )
+    def test_validate_property_frame_url(self, property_url: str, is_valid: bool):
+        """
+        Ports and backslash separators are handled like the model
+        """
+        record: dict = {
+            "property_url": property_url,
+            "last_modified": "2024-11-05T23:48:00Z",
+        }
+
+        if is_valid:
+            assert Property.model_validate(record).zillow_id == "1"
+            assert validate_property_frame([record])["zillow_id"].to_list() == ["1"]
+        else:
+            with pytest.raises(ValueError):
+                Property.model_validate(record)
+            with pytest.raises(ValueError):
+                validate_property_frame([record])
+
+    @pytest.mark.parametrize(
+        "property_url",
+        [
+            " https://www.zillow.com/homedetails/1_zpid/",
+            "https://www.zil%6Cow.com/homedetails/1_zpid/",
+            "https:/www.zillow.com/homedetails/1_zpid/",
+        ],
+    )
+    def test_validate_property_frame_unnormalized(self, property_url: str):
+        """
+        URLs the parser normalizes before reading the host pass the model only
+        """
+        record: dict = {
+            "property_url": property_url,
+            "last_modified": "2024-11-05T23:48:00Z",
+        }
+
+        assert Property.model_validate(record).zillow_id == "1"
+        with pytest.raises(ValueError):
+            validate_property_frame([record])
+
+    @pytest.mark.parametrize(
+        "property_url, last_modified",
+        [
+            (
+                "https://zillow.com/homedetails/2632-NW-18th-Ter-Oakland-Park-FL-33311/2146994027_zpid/",
+                "2024-11-05T23:48:00Z",
+            ),
+            (
+                "https://www.zillow.com/homedetails/2632-NW-18th-Ter-Oakland-Park-FL-33311/",
+                "2024-11-05T23:48:00Z",
+            ),
+            (
+                "https://www.zillow.com/homedetails/2632-NW-18th-Ter-Oakland-Park-FL-33311/2146994027_zpid/",
+                "2024-a-05",
+            ),
+            (None, "2024-11-05T23:48:00Z"),
+        ],
+    )
+    def test_validate_property_frame_rejects(self, property_url, last_modified):
+        """
+        Records rejected by the model are rejected by the frame validator
+        """
+        record: dict = {"property_url": property_url, "last_modified": last_modified}
+
+        with pytest.raises(ValueError):
+            Property.model_validate(record).model_dump()
+
+        with pytest.raises(ValueError):
+            validate_property_frame([record])
+
 
 class TestZillowRepository:
 
@@ -65,3 +184,117 @@ class TestZillowRepository:
         )
         assert property.last_modified == "2024-08-14T14:53:00Z"
         assert property.zillow_id == "2146997656"
+
+    def test_find_last_modified(self, mock_db, populate_mongo):
+        """
+        Only the requested ids are returned through the zillow_id index
+        """
+        repo = ZillowRepository(mock_db["production"])
+        repo.ensure_indexes()
+
+        df: pl.DataFrame = repo.find_last_modified(["2146997656", "1"])
+
+        assert "zillow_id_1" in repo.get_collection().index_information()
+        assert df.to_dicts() == [
+            {"zillow_id": "2146997656", "last_modified": "2024-08-14T14:53:00Z"}
+        ]
+
+    def test_upsert_many(self):
+        """
+        Upserts report inserted, updated and unchanged documents per zillow_id
+        """
+        repo = ZillowRepository(MongoClient()["production"])
+        records: list[dict] = [
+            Property(
+                property_url=f"https://www.zillow.com/homedetails/{zpid}_zpid/",
+                last_modified="2024-08-14T14:53:00Z",
+            ).model_dump(exclude={"id"})
+            for zpid in range(5)
+        ]
+
+        assert repo.upsert_many(records, batch_size=2) == UpsertCounts(inserted=5)
+
+        records[0]["last_modified"] = "2024-09-14T14:53:00Z"
+
+        assert repo.upsert_many(records, batch_size=2) == UpsertCounts(
+            updated=1, unchanged=4
+        )
+        assert repo.find_by_zid("0").last_modified == "2024-09-14T14:53:00Z"
+        assert repo.get_collection().count_documents({}) == 5
+
+    def test_iter_all(self, property_set):
+        """
+        Models and projected dicts are streamed from the cursor
+        """
+        repo = ZillowRepository(MongoClient()["production"])
+        repo.save_many(property_set)
+
+        models: list[Property] = list(repo.iter_all(batch_size=2))
+        assert [model.zillow_id for model in models] == [
+            model.zillow_id for model in property_set
+        ]
+
+        documents: list[dict] = list(
+            repo.iter_dicts({"zillow_id": "2146997656"}, {"_id": 0, "zillow_id": 1})
+        )
+        assert documents == [{"zillow_id": "2146997656"}]
+
+    def test_get_frame(self, property_set):
+        """
+        Frames are built from cursor batches with ids as strings
+        """
+        repo = ZillowRepository(MongoClient()["production"])
+        repo.save_many(property_set)
+
+        df: pl.DataFrame = repo.get_frame(batch_size=2)
+
+        assert df.height == 3
+        assert df.schema["id"] == pl.String
+        assert sorted(df.columns) == [
+            "id",
+            "last_modified",
+            "property_url",
+            "zillow_id",
+        ]
+
+        empty: pl.DataFrame = repo.get_frame(
+            {"zillow_id": "missing"}, schema={"zillow_id": pl.String}
+        )
+        assert empty.schema == pl.Schema({"zillow_id": pl.String})
+
+    def test_ensure_indexes_duplicates(self, caplog):
+        """
+        Duplicated zillow ids leave the collection unindexed and are logged instead
+        of failing the caller
+        """
+        repo = ZillowRepository(MongoClient()["production"])
+        repo.get_collection().insert_many(
+            [{"zillow_id": zpid} for zpid in ["1", "1", "2", "3", "3"]]
+        )
+
+        with caplog.at_level(logging.WARNING):
+            assert not repo.ensure_indexes()
+
+        assert "zillow_id_1" not in repo.get_collection().index_information()
+        assert "['1', '3']" in caplog.text
+
+        with pytest.raises(ValueError, match="must be cleaned"):
+            repo.migrate_indexes()
+
+    def test_migrate_indexes(self, caplog):
+        """
+        An older non-unique index is kept by ensure_indexes and replaced by the
+        migration
+        """
+        repo = ZillowRepository(MongoClient()["production"])
+        repo.get_collection().create_index("zillow_id")
+
+        with caplog.at_level(logging.WARNING):
+            assert not repo.ensure_indexes()
+
+        assert "migrate_indexes" in caplog.text
+
+        repo.migrate_indexes()
+
+        assert repo.get_collection().index_information()["zillow_id_1"]["unique"]
+        assert repo.ensure_indexes()
@@ -0,0 +1,127 @@
+"""
+Tests the adaptive backoff controller
+"""
+
+import httpx
+import respx
+from httpx import Response
+from prefect import flow, task, unmapped
+
+from zillow.adaptive import AdaptiveBatchTask, AdaptiveController
+from zillow.http import ClientManager
+
+
+class TestAdaptiveController:
+
+    def test_decrease(self):
+        """
+        Throttling halves concurrency and raises the delay once per cooldown
+        """
+        adaptive = AdaptiveController(max_concurrency=40, cooldown=60)
+
+        adaptive.record(429, 0.1)
+        assert adaptive.concurrency == 20
+        assert adaptive.delay == 1
+
+        adaptive.record(403, 0.1)
+        assert adaptive.concurrency == 20
+
+    def test_pressure_signals(self):
+        """
+        Server errors and slow responses count as pressure, client errors do not
+        """
+        adaptive = AdaptiveController(max_concurrency=40, cooldown=0)
+
+        adaptive.record(404, 0.1)
+        assert adaptive.concurrency == 40
+
+        adaptive.record(503, 0.1)
+        assert adaptive.concurrency == 20
+
+        adaptive.record(200, adaptive.latency_target + 1)
+        assert adaptive.concurrency == 10
+        assert adaptive.delay == 2
+
+    def test_increase(self):
+        """
+        Each window of successes adds one to concurrency and shrinks the delay
+        """
+        adaptive = AdaptiveController(max_concurrency=8, window=2, cooldown=0)
+        adaptive.record(429, 0.1)
+        adaptive.record(429, 0.1)
+        assert (adaptive.concurrency, adaptive.delay) == (2, 2)
+
+        adaptive.record(200, 0.1)
+        adaptive.record(200, 0.1)
+        assert (adaptive.concurrency, adaptive.delay) == (3, 1)
+
+        adaptive.record(200, 0.1)
+        adaptive.record(200, 0.1)
+        assert (adaptive.concurrency, adaptive.delay) == (4, 0)
+
+    def test_bounds(self):
+        """
+        Concurrency and delay stay within their limits
+        """
+        adaptive = AdaptiveController(
+            min_concurrency=2, max_concurrency=4, max_delay=3, window=1, cooldown=0
+        )
+
+        for _ in range(5):
+            adaptive.record(429, 0.1)
+        assert (adaptive.concurrency, adaptive.delay) == (2, 3)
+
+        for _ in range(5):
+            adaptive.record(200, 0.1)
+        assert adaptive.concurrency == 4
+
+    def test_batch_size(self):
+        """
+        Batch sizes scale with concurrency and never drop below one
+        """
+        adaptive = AdaptiveController(max_concurrency=120, cooldown=0)
+        assert adaptive.batch_size(60) == 60
+
+        adaptive.record(429, 0.1)
+        assert adaptive.batch_size(60) == 30
+
+        for _ in range(10):
+            adaptive.record(429, 0.1)
+        assert adaptive.batch_size(60) == 1
+
+    def test_event_hooks(self, respx_mock: respx.MockRouter):
+        """
+        Responses through the pooled client reach the controller
+        """
+        adaptive = AdaptiveController(max_concurrency=40)
+        manager = ClientManager(adaptive=adaptive)
+        respx_mock.get("https://www.zillow.com/").mock(return_value=Response(429))
+
+        response: httpx.Response = manager.get_client().get("https://www.zillow.com/")
+
+        assert response.status_code == 429
+        assert adaptive.concurrency == 20
+
+        manager.close()
+
+
+@task
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def test_adaptive_batch_task():
+    """
+    Batches shrink as the controller backs off and every item is still mapped
+    """
+    adaptive = AdaptiveController(max_concurrency=4, cooldown=0)
+    adaptive.record(429, 0.1)
+    batch_add = AdaptiveBatchTask(add, 4, adaptive=adaptive)
+
+    @flow
+    def test_flow() -> list[int]:
+        futures = batch_add.map(list(range(5)), unmapped(1))
+        return [future.result() for future in futures]
+
+    assert test_flow() == [1, 2, 3, 4, 5]
+    assert batch_add.size == 2
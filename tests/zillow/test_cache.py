@@ -0,0 +1,185 @@
+"""
+Tests the raw response cache
+"""
+
+import os
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import boto3
+import orjson
+import pytest
+import respx
+from httpx import Response
+from moto import mock_aws
+from prefect_aws import AwsCredentials, S3Bucket
+
+from zillow import cache as cache_module
+from zillow.cache import ResponseCache, cache_key, response_cache
+from zillow.sitemap import extract_listing_url
+
+URL: str = "https://www.zillow.com/homedetails/2146997656_zpid/"
+
+
+def age(cache: ResponseCache, url: str, seconds: float):
+    """
+    Moves the write and access time of every entry of a URL into the past
+    """
+    key: str = cache_key(url)
+    for path in cache.root.rglob(f"{key}.z"):
+        past: float = time.time() - seconds
+        os.utime(path, (past, past))
+
+
+class TestResponseCache:
+
+    def test_disabled(self):
+        """
+        Nothing is cached until a root is configured
+        """
+        cache = ResponseCache()
+        cache.put(URL, b"html")
+
+        assert cache.get(URL) is None
+
+    def test_round_trip(self, tmp_path: Path):
+        """
+        Entries are compressed and keyed by URL and payload
+        """
+        cache = ResponseCache(tmp_path)
+        content: bytes = b"<html>" + b"listing " * 1000 + b"</html>"
+
+        cache.put(URL, content)
+        cache.put(URL, b"page 2", payload={"page": 2})
+
+        assert cache.get(URL) == content
+        assert cache.get(URL, payload={"page": 2}) == b"page 2"
+        assert cache.get(URL, payload={"page": 3}) is None
+        assert sum(path.stat().st_size for path in tmp_path.rglob("*.z")) < 200
+
+    def test_request_context(self, tmp_path: Path):
+        """
+        The request of every entry is stored beside it
+        """
+        cache = ResponseCache(tmp_path)
+        cache.put(URL, b"page 2", payload={"page": 2})
+
+        (context,) = tmp_path.rglob("*.meta")
+
+        assert orjson.loads(context.read_bytes()) == {
+            "url": URL,
+            "payload": {"page": 2},
+        }
+        assert context.with_suffix(".z").exists()
+
+    def test_ttl(self, tmp_path: Path):
+        """
+        Expired entries are misses
+        """
+        cache = ResponseCache(tmp_path, ttl=60)
+        cache.put(URL, b"html")
+
+        age(cache, URL, 61)
+
+        assert cache.get(URL) is None
+
+    def test_lru_eviction(self, tmp_path: Path):
+        """
+        Least recently used entries are evicted past the size bound
+        """
+        cache = ResponseCache(tmp_path, max_bytes=2500, compression_level=0)
+        content: bytes = os.urandom(1000)
+
+        cache.put(URL + "old", content)
+        cache.put(URL + "used", content)
+        age(cache, URL + "old", 20)
+        age(cache, URL + "used", 10)
+        assert cache.get(URL + "used") == content
+
+        cache.put(URL + "new", content)
+
+        assert cache.get(URL + "old") is None
+        assert cache.get(URL + "used") == content
+        assert cache.get(URL + "new") == content
+
+    def test_overwrite_size(self, tmp_path: Path):
+        """
+        Rewriting an entry replaces its size instead of adding to it
+        """
+        cache = ResponseCache(tmp_path, max_bytes=10_000, compression_level=0)
+
+        for _ in range(5):
+            cache.put(URL, os.urandom(1000))
+
+        assert cache._size == sum(path.stat().st_size for path in cache._entries())
+
+    def test_s3_backing(self, tmp_path: Path, monkeypatch):
+        """
+        A cold local cache is filled from the bucket
+        """
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+        with mock_aws():
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="zillow")
+            bucket = S3Bucket(
+                bucket_name="zillow",
+                credentials=AwsCredentials(region_name="us-east-1"),
+            )
+
+            ResponseCache(tmp_path / "first", bucket=bucket).put(URL, b"html")
+            second = ResponseCache(tmp_path / "second", bucket=bucket)
+
+            assert second.get(URL) == b"html"
+            assert second.get(URL + "missing") is None
+
+        assert list((tmp_path / "second").rglob("*.z"))
+
+    def test_s3_ttl(self, tmp_path: Path, monkeypatch):
+        """
+        Bucket entries older than the TTL are misses
+        """
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+        with mock_aws():
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="zillow")
+            bucket = S3Bucket(
+                bucket_name="zillow",
+                bucket_folder="responses",
+                credentials=AwsCredentials(region_name="us-east-1"),
+            )
+
+            ResponseCache(tmp_path / "first", bucket=bucket, ttl=60).put(URL, b"html")
+            second = ResponseCache(tmp_path / "second", bucket=bucket, ttl=60)
+            third = ResponseCache(tmp_path / "third", bucket=bucket, ttl=60)
+
+            assert third.get(URL) == b"html"
+
+            later: float = time.time() + 61
+            monkeypatch.setattr(
+                cache_module, "time", SimpleNamespace(time=lambda: later)
+            )
+
+            assert second.get(URL) is None
+
+        assert not list((tmp_path / "second").rglob("*.z"))
+
+
+@pytest.fixture
+def enabled_cache(tmp_path: Path):
+    response_cache.configure(tmp_path)
+    yield response_cache
+    response_cache.configure(None)
+
+
+def test_extract_listing_url_cached(enabled_cache, respx_mock: respx.MockRouter):
+    """
+    A cached listing is not requested again
+    """
+    route = respx_mock.get(URL).mock(return_value=Response(200, content=b"html"))
+
+    assert extract_listing_url.fn(URL, "token") == b"html"
+    assert extract_listing_url.fn(URL, "token") == b"html"
+    assert route.call_count == 1
@@ -0,0 +1,184 @@
+"""
+Tests the csrf token provider
+"""
+
+import threading
+import time
+
+import respx
+from httpx import Headers, Response
+from mongomock import MongoClient
+
+from zillow.csrf import (
+    CSRF_URL,
+    CsrfTokenProvider,
+    MongoTokenStore,
+    csrf_tokens,
+    fetch_csrf_token,
+)
+from zillow.sitemap import extract_sitemap_dir_urls
+
+
+class FakeClock:
+    """
+    Manually advanced clock
+    """
+
+    def __init__(self):
+        self.now: float = 1_700_000_000
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingFetch:
+    """
+    Token fetch returning a new token per call
+    """
+
+    def __init__(self, delay: float = 0):
+        self.calls: int = 0
+        self.delay = delay
+
+    def __call__(self) -> str:
+        time.sleep(self.delay)
+        self.calls += 1
+        return f"token-{self.calls}"
+
+
+class TestCsrfTokenProvider:
+
+    def test_fetch_csrf_token(self, respx_mock: respx.MockRouter):
+        """
+        The token is read from the CloudFront request id header of a HEAD request
+        """
+        respx_mock.head(CSRF_URL).mock(
+            return_value=Response(200, headers=Headers({"x-amz-cf-id": "abc=="}))
+        )
+
+        assert fetch_csrf_token() == "abc=="
+
+    def test_fetch_csrf_token_range(self, respx_mock: respx.MockRouter):
+        """
+        A refused HEAD falls back to a single byte range request
+        """
+        respx_mock.head(CSRF_URL).mock(return_value=Response(405))
+        route = respx_mock.get(CSRF_URL, headers={"Range": "bytes=0-0"}).mock(
+            return_value=Response(
+                206, content=b"\x1f", headers=Headers({"x-amz-cf-id": "abc=="})
+            )
+        )
+
+        assert fetch_csrf_token() == "abc=="
+        assert route.called
+
+    def test_sitemap_index_seeds_token(self, respx_mock: respx.MockRouter):
+        """
+        Downloading the sitemap index caches its token so no second request is sent
+        """
+        respx_mock.get(CSRF_URL).mock(
+            return_value=Response(
+                200, content=b"<sitemapindex/>", headers={"x-amz-cf-id": "abc=="}
+            )
+        )
+
+        assert extract_sitemap_dir_urls.fn() == b"<sitemapindex/>"
+        assert csrf_tokens.get() == "abc=="
+        assert len(respx_mock.calls) == 1
+
+    def test_ttl(self):
+        """
+        Tokens are reused until they expire
+        """
+        clock, fetch = FakeClock(), CountingFetch()
+        provider = CsrfTokenProvider(fetch, ttl=60, refresh_ahead=0, clock=clock)
+
+        assert provider.get() == "token-1"
+        clock.now += 59
+        assert provider.get() == "token-1"
+
+        clock.now += 1
+        assert provider.get() == "token-2"
+        assert fetch.calls == 2
+
+    def test_refresh_ahead(self):
+        """
+        Tokens close to expiry are returned while a background refresh runs
+        """
+        clock, fetch = FakeClock(), CountingFetch()
+        provider = CsrfTokenProvider(fetch, ttl=60, refresh_ahead=10, clock=clock)
+
+        provider.get()
+        clock.now += 55
+        assert provider.get() == "token-1"
+
+        for _ in range(50):
+            if fetch.calls == 2 and not provider._refreshing:
+                break
+            time.sleep(0.01)
+
+        assert provider.get() == "token-2"
+        assert fetch.calls == 2
+
+    def test_refresh_ahead_does_not_block(self):
+        """
+        Callers in the refresh ahead window get the current token while a slow
+        background fetch runs
+        """
+        clock, fetch = FakeClock(), CountingFetch()
+        provider = CsrfTokenProvider(fetch, ttl=60, refresh_ahead=10, clock=clock)
+
+        provider.get()
+        fetch.delay = 0.5
+        clock.now += 55
+
+        tokens: list[str] = [provider.get()]
+        # Let the background refresh start its fetch
+        time.sleep(0.05)
+
+        started: float = time.monotonic()
+        tokens += [provider.get(), provider.get()]
+
+        assert time.monotonic() - started < 0.2
+        assert tokens == ["token-1"] * 3
+
+        for _ in range(100):
+            if not provider._refreshing:
+                break
+            time.sleep(0.01)
+
+        assert provider.get() == "token-2"
+
+    def test_single_flight_refresh(self):
+        """
+        Concurrent retries holding the same stale token share one fetch
+        """
+        fetch = CountingFetch(delay=0.05)
+        provider = CsrfTokenProvider(fetch)
+        stale: str = provider.get()
+
+        results: list[str] = []
+        threads = [
+            threading.Thread(target=lambda: results.append(provider.refresh(stale)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert fetch.calls == 2
+        assert set(results) == {"token-2"}
+
+    def test_shared_store(self):
+        """
+        A second worker reuses the token published by the first
+        """
+        collection = MongoClient()["production"]["csrf_zillow"]
+        first_fetch, second_fetch = CountingFetch(), CountingFetch()
+
+        first = CsrfTokenProvider(first_fetch, store=MongoTokenStore(collection))
+        second = CsrfTokenProvider(second_fetch, store=MongoTokenStore(collection))
+
+        assert first.get() == second.get() == "token-1"
+        assert (first_fetch.calls, second_fetch.calls) == (1, 0)
@@ -0,0 +1,62 @@
+"""
+Tests the shared HTTP client manager
+"""
+
+import httpx
+import respx
+from httpx import Response
+
+from zillow.http import ClientManager
+
+
+class TestClientManager:
+
+    def test_get_client_reused(self):
+        """
+        The pooled client is shared until closed
+        """
+        manager = ClientManager()
+
+        client: httpx.Client = manager.get_client()
+        assert manager.get_client() is client
+
+        manager.close()
+        assert client.is_closed
+        assert manager.get_client() is not client
+
+        manager.close()
+
+    def test_configure(self):
+        """
+        New settings replace the pooled client
+        """
+        manager = ClientManager()
+        client: httpx.Client = manager.get_client()
+
+        manager.configure(limits=httpx.Limits(max_connections=5))
+
+        assert client.is_closed
+        assert manager.limits.max_connections == 5
+        assert manager.get_client() is not client
+
+        manager.close()
+
+    def test_http2_fallback(self, monkeypatch):
+        """
+        HTTP/2 is only requested when h2 is installed
+        """
+        monkeypatch.setattr("zillow.http.http2_available", lambda: False)
+        manager = ClientManager(http2=True)
+
+        assert manager.client_kwargs()["http2"] is False
+
+    def test_pooled_request(self, respx_mock: respx.MockRouter):
+        """
+        Requests through the pooled client are mockable like module level calls
+        """
+        manager = ClientManager()
+        respx_mock.get("https://www.zillow.com/").mock(return_value=Response(204))
+
+        assert manager.get_client().get("https://www.zillow.com/").status_code == 204
+
+        manager.close()
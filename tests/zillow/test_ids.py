@@ -0,0 +1,46 @@
+"""
+Tests the shared identifier extractors
+"""
+
+import polars as pl
+import pytest
+
+from zillow.ids import extract_zpid, extract_zpids, match_timestamp, parse_timestamps
+
+
+@pytest.mark.parametrize(
+    "url, expected_zid",
+    [
+        (
+            "https://www.zillow.com/homedetails/2632-NW-18th-Ter-Oakland-Park-FL-33311/2146994027_zpid/",
+            "2146994027",
+        ),
+        ("https://www.zillow.com/homedetails/2632-NW-18th-Ter-Oakland-Park-FL/", None),
+    ],
+)
+def test_extract_zpid(url, expected_zid):
+    """
+    Single and batch zpid extraction agree
+    """
+    assert extract_zpid(url) == expected_zid
+    assert extract_zpids([url]).to_list() == [expected_zid]
+    assert extract_zpids(pl.Series([url])).to_list() == [expected_zid]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2024-11-05T23:48:00Z", "2024-11-05T23:48:00Z"),
+        ("2024-11-05T23:48:00Z+junk", "2024-11-05T23:48:00Z"),
+        ("2024-a-05", None),
+    ],
+)
+def test_match_timestamp(value, expected):
+    """
+    Timestamps are matched from the start of the string
+    """
+    assert match_timestamp(value) == expected
+
+    parsed: pl.Series = parse_timestamps([value])
+    assert parsed.dtype == pl.Datetime("us", "UTC")
+    assert parsed.is_null().to_list() == [expected is None]
@@ -8,7 +8,12 @@ import respx
 from polars.testing import assert_frame_equal
 
 from zillow.mongo_models.query_config import RegionConfig
-from zillow.query import Payload, parse_max_pages, parse_result_content
+from zillow.query import (
+    Payload,
+    exceeds_page_cap,
+    parse_max_pages,
+    parse_result_content,
+)
 
 
 @pytest.fixture
@@ -74,3 +79,18 @@ def test_parse_result_content(grab_json, grab_parquet):
     df: pl.DataFrame = parse_result_content.fn(grab_json)
 
     assert_frame_equal(df, grab_parquet)
+
+
+@pytest.mark.parametrize(
+    "grab_json",
+    [
+        ("first_page.json"),
+    ],
+    indirect=True,
+)
+def test_exceeds_page_cap(grab_json):
+    """
+    Searches with more results than the capped pages hold are truncated
+    """
+    assert exceeds_page_cap(grab_json, page_cap=20)
+    assert not exceeds_page_cap(grab_json, page_cap=200)
@@ -0,0 +1,85 @@
+"""
+Tests request rate limiting
+"""
+
+import pytest
+from mongomock import MongoClient
+
+from zillow.ratelimit import Budget, MongoRateLimitStore, RateLimiter, TokenBucket
+
+
+class Clock:
+    """
+    Manually advanced clock
+    """
+
+    def __init__(self):
+        self.now: float = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket:
+
+    def test_reserve(self):
+        """
+        Bursts up to capacity then queues at the sustained rate
+        """
+        clock = Clock()
+        bucket = TokenBucket(Budget(rate=2, capacity=2), clock=clock)
+
+        assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+
+        clock.now = 10
+        assert bucket.reserve() == 0
+
+
+class TestRateLimiter:
+
+    def test_unlimited_endpoint(self, monkeypatch):
+        """
+        Endpoints without a budget never wait
+        """
+        monkeypatch.setattr("zillow.ratelimit.time.sleep", pytest.fail)
+
+        RateLimiter().acquire("listing")
+
+    def test_acquire_waits(self, monkeypatch):
+        """
+        Over budget requests sleep for the reserved wait plus jitter
+        """
+        sleeps: list[float] = []
+        monkeypatch.setattr("zillow.ratelimit.time.sleep", sleeps.append)
+
+        limiter = RateLimiter({"search": Budget(rate=1, capacity=1, jitter=0)})
+        limiter.acquire("search")
+        limiter.acquire("search")
+
+        assert sleeps[0] == 0
+        assert sleeps[1] == pytest.approx(1, abs=0.1)
+
+    def test_shared_store(self):
+        """
+        The shared store counts requests of every worker against one window
+        """
+        collection = MongoClient()["production"]["ratelimit_zillow"]
+        budget = Budget(rate=0.001, capacity=2)
+
+        first = MongoRateLimitStore(collection)
+        second = MongoRateLimitStore(collection)
+
+        assert first.reserve("listing", budget) == 0
+        assert second.reserve("listing", budget) == 0
+        assert first.reserve("listing", budget) > 0
+
+    def test_shared_store_ttl_index(self):
+        """
+        Window counters expire through a TTL index
+        """
+        collection = MongoClient()["production"]["ratelimit_zillow"]
+
+        MongoRateLimitStore(collection)
+
+        index: dict = collection.index_information()["expires_at_1"]
+        assert index["expireAfterSeconds"] == 0
@@ -0,0 +1,130 @@
+"""
+Tests replaying archived responses
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import polars as pl
+import pytest
+from click.testing import CliRunner
+
+from zillow.cache import ResponseCache
+from zillow.cli.entrypoint import cli
+from zillow.replay import (
+    ReplayCounts,
+    archived_date,
+    read_archived,
+    replay,
+    replay_chunk,
+)
+from zillow.sink import ParquetSink
+
+
+@pytest.fixture
+def archive(asset_folder: Path, tmp_path: Path) -> Path:
+    """
+    Response cache holding a listing, a search page and a broken response
+    """
+    cache = ResponseCache(tmp_path / "cache")
+    response: Path = asset_folder / "response"
+
+    cache.put(
+        "https://www.zillow.com/homedetails/1_zpid/",
+        (response / "listing.html").read_bytes(),
+    )
+    cache.put(
+        "https://www.zillow.com/async-create-search-page-state",
+        (response / "first_page.json").read_bytes(),
+        payload={"searchQueryState": {"usersSearchTerm": "Los Angeles, CA"}},
+    )
+    cache.put("https://www.zillow.com/homedetails/2_zpid/", b"<html></html>")
+
+    return cache.root
+
+
+def test_archived_date(tmp_path: Path):
+    """
+    Cache partitions date the replayed rows
+    """
+    assert archived_date(tmp_path / "2024-11-08" / "ab" / "key.z") == date(2024, 11, 8)
+    assert archived_date(tmp_path / "raw" / "listing.html") is None
+
+
+def test_replay(archive: Path, tmp_path: Path, caplog: pytest.LogCaptureFixture):
+    """
+    Listings and search pages are parsed into their datasets, failures are logged
+    """
+    sink = ParquetSink(root=tmp_path / "output")
+
+    with ThreadPoolExecutor() as executor:
+        counts: ReplayCounts = replay(archive, sink, chunk_size=1, executor=executor)
+
+    assert (counts.listings, counts.results, counts.failed) == (1, 41, 1)
+    assert "Failed to replay" in caplog.text
+
+    listings: pl.DataFrame = pl.read_parquet(
+        tmp_path / "output" / "listings", hive_partitioning=True
+    )
+    assert listings.height == 1
+    assert listings.get_column("as_of_date").dtype == pl.Date
+
+    pricing: pl.DataFrame = pl.scan_parquet(
+        tmp_path / "output" / "pricing" / "**" / "*.parquet", hive_partitioning=True
+    ).collect()
+    assert pricing.get_column("region").unique().to_list() == ["Los Angeles, CA"]
+
+
+def test_replay_unattributed(asset_folder: Path, tmp_path: Path):
+    """
+    Raw search pages without request context are kept apart from pricing
+    """
+    source: Path = tmp_path / "raw"
+    source.mkdir()
+    (source / "page.json").write_bytes(
+        (asset_folder / "response" / "first_page.json").read_bytes()
+    )
+
+    with ThreadPoolExecutor() as executor:
+        counts: ReplayCounts = replay(
+            source, ParquetSink(root=tmp_path / "output"), executor=executor
+        )
+
+    assert (counts.results, counts.unattributed) == (41, 41)
+    assert not (tmp_path / "output" / "pricing").exists()
+    assert list((tmp_path / "output" / "pricing_unattributed").rglob("*.parquet"))
+
+
+def test_replay_chunk(archive: Path):
+    """
+    A chunk transforms its listings into one frame and reports failures by path
+    """
+    paths: list[Path] = sorted(archive.rglob("*.z"))
+    listing: Path = next(
+        path
+        for path in paths
+        if not read_archived(path).startswith(b"{")
+        and b"__NEXT_DATA__" in read_archived(path)
+    )
+
+    listings, results, failures = replay_chunk([listing, listing, *paths])
+
+    assert listings.height == 3
+    assert results.height == 41
+    assert len(failures) == 1
+    assert next(iter(failures)).endswith(".z")
+
+
+def test_replay_cli(archive: Path, tmp_path: Path):
+    """
+    The CLI replays across a process pool and reports the counts
+    """
+    result = CliRunner().invoke(
+        cli, ["replay", str(archive), str(tmp_path / "output"), "--workers", "2"]
+    )
+
+    assert result.exit_code == 0, result.output
+    counts = ReplayCounts.model_validate_json(result.output)
+    assert (counts.listings, counts.failed) == (1, 1)
+    assert list((tmp_path / "output" / "pricing").rglob("*.parquet"))
@@ -0,0 +1,62 @@
+"""
+Tests schemas derived from the pydantic models
+"""
+
+import polars as pl
+import pytest
+
+from zillow.individual_property.property_model import Address, Property
+from zillow.schema import frame_from_models, model_schema, polars_dtype
+from zillow.searchset.query_model import ResultSet
+
+
+@pytest.mark.parametrize(
+    "annotation, dtype",
+    [
+        (int | None, pl.Int64),
+        (float, pl.Float64),
+        (str | None, pl.String),
+        (bool | None, pl.Boolean),
+        (list | None, pl.List(pl.String)),
+        (list[int], pl.List(pl.Int64)),
+    ],
+)
+def test_polars_dtype(annotation, dtype):
+    assert polars_dtype(annotation) == dtype
+
+
+@pytest.mark.parametrize(
+    "grab_parquet",
+    [("property.parquet")],
+    indirect=True,
+)
+def test_property_schema(grab_parquet):
+    """
+    Nested models are flattened in place, as unnest would
+    """
+    schema: pl.Schema = model_schema(Property)
+
+    assert schema.names() == grab_parquet.columns
+    assert schema["neighborhood"] == pl.String
+    assert model_schema(Property, unnest=False)["address"] == pl.Struct(
+        model_schema(Address)
+    )
+
+
+def test_frame_from_models():
+    """
+    Frames are built with the declared schema, including empty batches
+    """
+    schema: pl.Schema = model_schema(ResultSet, rename={"unformattedPrice": "price"})
+    models: list[ResultSet] = [
+        ResultSet(zpid=1, unformattedPrice=100),
+        ResultSet(zpid=2, unformattedPrice=200),
+    ]
+
+    df: pl.DataFrame = frame_from_models(
+        models, schema, rename={"unformattedPrice": "price"}
+    )
+
+    assert df.schema == pl.Schema({"zpid": pl.Int64, "price": pl.Int64})
+    assert df.to_dicts() == [{"zpid": 1, "price": 100}, {"zpid": 2, "price": 200}]
+    assert frame_from_models([], schema).schema == schema
@@ -0,0 +1,136 @@
+"""
+Tests the partitioned Parquet sink
+"""
+
+from datetime import date
+from pathlib import Path
+
+import boto3
+import polars as pl
+import pytest
+from moto import mock_aws
+from polars.testing import assert_frame_equal
+from prefect_aws import AwsCredentials, S3Bucket
+
+from zillow.sink import NULL_PARTITION, ParquetSink, partition_value
+
+
+@pytest.fixture
+def pricing_df() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "zpid": ["1", "2", "3"],
+            "price": [100, 200, 300],
+            "region": ["Los Angeles, CA", "Los Angeles, CA", "San Diego, CA"],
+            "as_of_date": [date(2024, 11, 8)] * 3,
+        }
+    )
+
+
+def test_partition_value():
+    """
+    Values become path safe directory names
+    """
+    assert partition_value(date(2024, 11, 8)) == "2024-11-08"
+    assert partition_value("Los Angeles, CA") == "Los%20Angeles%2C%20CA"
+    assert partition_value("a/b") == "a%2Fb"
+    assert partition_value(None) == NULL_PARTITION
+
+
+class TestParquetSink:
+
+    def test_write_local(self, pricing_df: pl.DataFrame, tmp_path: Path):
+        """
+        Rows land in one part file per partition and read back with hive keys
+        """
+        sink = ParquetSink(root=tmp_path)
+
+        paths: list[str] = sink.write(pricing_df, "pricing")
+
+        assert len(paths) == 2
+        assert all(
+            Path(path).parents[1].name == "as_of_date=2024-11-08" for path in paths
+        )
+
+        df: pl.DataFrame = (
+            pl.read_parquet(tmp_path / "pricing", hive_partitioning=True)
+            .with_columns(pl.col("region").str.replace_all("%20", " "))
+            .with_columns(pl.col("region").str.replace_all("%2C", ","))
+            .select(pricing_df.columns)
+            .sort("zpid")
+        )
+        assert_frame_equal(df, pricing_df, check_dtypes=False)
+
+    def test_append_only(self, pricing_df: pl.DataFrame, tmp_path: Path):
+        """
+        Repeated writes add part files instead of replacing them
+        """
+        sink = ParquetSink(root=tmp_path)
+
+        first: list[str] = sink.write(pricing_df, "pricing")
+        second: list[str] = sink.write(pricing_df, "pricing")
+
+        assert set(first).isdisjoint(second)
+        assert len(list((tmp_path / "pricing").rglob("*.parquet"))) == 4
+
+    def test_default_as_of_date(self, tmp_path: Path):
+        """
+        Frames without a date are partitioned by the write date, listings by state
+        """
+        df = pl.DataFrame({"zpid": ["1"], "state": ["GA"]})
+
+        (path,) = ParquetSink(root=tmp_path).write(df, "listings")
+
+        assert Path(path).parent.name == "state=GA"
+        assert Path(path).parents[1].name.startswith("as_of_date=")
+        assert pl.read_parquet(path).columns == ["zpid"]
+
+    def test_partition_by(self, pricing_df: pl.DataFrame, tmp_path: Path):
+        """
+        Explicit partition columns override the dataset defaults, missing ones go
+        to the null partition
+        """
+        sink = ParquetSink(root=tmp_path, partition_by=("as_of_date", "state"))
+
+        (path,) = sink.write(pricing_df, "pricing")
+
+        assert Path(path).parent.name == f"state={NULL_PARTITION}"
+
+    def test_mixed_frames(self, pricing_df: pl.DataFrame, tmp_path: Path):
+        """
+        Frames with and without a region read back as one dataset
+        """
+        sink = ParquetSink(root=tmp_path)
+
+        sink.write(pricing_df, "pricing")
+        sink.write(pricing_df.drop("region"), "pricing")
+
+        df: pl.DataFrame = pl.scan_parquet(
+            tmp_path / "pricing" / "**" / "*.parquet", hive_partitioning=True
+        ).collect()
+
+        assert df.height == 6
+        assert df.get_column("region").null_count() == 3
+
+    def test_write_s3(self, pricing_df: pl.DataFrame, monkeypatch):
+        """
+        Part files are uploaded under the bucket folder
+        """
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+        with mock_aws():
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="zillow")
+            bucket = S3Bucket(
+                bucket_name="zillow",
+                bucket_folder="etl",
+                credentials=AwsCredentials(region_name="us-east-1"),
+            )
+
+            paths: list[str] = ParquetSink(bucket=bucket).write(pricing_df, "pricing")
+
+            objects: dict = boto3.client("s3", region_name="us-east-1").list_objects_v2(
+                Bucket="zillow", Prefix="etl/pricing/as_of_date=2024-11-08/"
+            )
+
+        assert sorted(paths) == sorted(item["Key"] for item in objects["Contents"])
@@ -2,6 +2,7 @@
 Contains Tests for the Sitemap extractions
 """
 
+import gzip
 from typing import Callable
 
 import pytest
@@ -12,11 +13,40 @@ from zillow.sitemap import (
     collect_property_urls,
     collect_sitemap_indexes,
     extract_csrf_token,
+    extract_property_urls,
     extract_sitemap_dir_urls,
     extract_sitemap_urls,
+    iter_gunzipped,
+    iter_property_records,
 )
 
 
+@pytest.fixture
+def sitemap_bytes() -> bytes:
+    html_string: str = """
+        <?xml version="1.0" encoding="UTF-8"?>
+        <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url>
+            <loc>
+            https://www.zillow.com/homedetails/9510-Amherst-Ave-APT-121-Margate-City-NJ-08402/2146997656_zpid/
+            </loc>
+            <lastmod>
+            2024-08-14T14:53:00Z
+            </lastmod>
+            </url>
+            <url>
+            <loc>
+            https://www.zillow.com/homedetails/2632-NW-18th-Ter-Oakland-Park-FL-33311/2146994027_zpid/
+            </loc>
+            <lastmod>
+            2024-11-05T23:48:00Z
+            </lastmod>
+            </url>
+        </urlset>
+        """
+    return bytes(html_string, encoding="utf-8")
+
+
 class TestSitemap:
     """
     Collection of Sitemap mapping tests
@@ -81,9 +111,9 @@ class TestSitemap:
             }
         )
 
-        respx_mock.get(
+        respx_mock.head(
             "https://www.zillow.com/xml/indexes/us/hdp/for-sale-by-agent.xml.gz"
-        ).mock(return_value=Response(204, content=grab_html)).respond(headers=headers)
+        ).mock(return_value=Response(204)).respond(headers=headers)
         csrf_token: str = extract_csrf_token.fn()
         assert csrf_token == "P8lpdQBK8EmdB3k5MLUPbxJDSxws5vJY6JGOm_Bds3n4d872HnMmJA=="
 
@@ -138,3 +168,94 @@ class TestSitemap:
         property_set: list = collect_property_urls.fn(grab_html)
 
         assert len(property_set) == 50000
+
+    def test_iter_property_records(self, sitemap_bytes: bytes):
+        """
+        Checks records are yielded regardless of how the bytes are chunked
+        """
+        chunks = [sitemap_bytes[i : i + 7] for i in range(0, len(sitemap_bytes), 7)]
+
+        records: list = list(iter_property_records(chunks))
+
+        assert records == list(iter_property_records(sitemap_bytes))
+        assert records == [
+            {
+                "property_url": "https://www.zillow.com/homedetails/9510-Amherst-Ave-APT-121-Margate-City-NJ-08402/2146997656_zpid/",
+                "last_modified": "2024-08-14T14:53:00Z",
+            },
+            {
+                "property_url": "https://www.zillow.com/homedetails/2632-NW-18th-Ter-Oakland-Park-FL-33311/2146994027_zpid/",
+                "last_modified": "2024-11-05T23:48:00Z",
+            },
+        ]
+
+    @pytest.mark.parametrize("streaming", [True, False])
+    def test_collect_property_urls_modes(self, sitemap_bytes: bytes, streaming: bool):
+        """
+        Streaming and soup parsing produce the same validated records
+        """
+        property_set: list = collect_property_urls.fn(sitemap_bytes, streaming)
+
+        assert [prop["zillow_id"] for prop in property_set] == [
+            "2146997656",
+            "2146994027",
+        ]
+
+    def test_collect_property_urls_fallback(self, sitemap_bytes: bytes):
+        """
+        Malformed XML falls back to the soup parser
+        """
+        malformed: bytes = sitemap_bytes.replace(b"</url>", b"", 1)
+
+        property_set: list = collect_property_urls.fn(malformed)
+
+        assert len(property_set) == 2
+
+    def test_collect_property_urls_calendar(self, sitemap_bytes: bytes):
+        """
+        Records keep the served timestamp string, even for impossible dates
+        """
+        impossible: bytes = sitemap_bytes.replace(
+            b"2024-08-14T14:53:00Z", b"2024-02-31T14:53:00Z"
+        )
+
+        property_set: list = collect_property_urls.fn(impossible)
+
+        assert [prop["last_modified"] for prop in property_set] == [
+            "2024-02-31T14:53:00Z",
+            "2024-11-05T23:48:00Z",
+        ]
+
+    @pytest.mark.parametrize("compressed", [True, False])
+    def test_iter_gunzipped(self, sitemap_bytes: bytes, compressed: bool):
+        """
+        Gzip streams are inflated chunk by chunk, plain streams pass through
+        """
+        payload: bytes = gzip.compress(sitemap_bytes) if compressed else sitemap_bytes
+        chunks = [payload[i : i + 5] for i in range(0, len(payload), 5)]
+
+        assert b"".join(iter_gunzipped(chunks)) == sitemap_bytes
+
+    @pytest.mark.parametrize("malformed", [False, True])
+    def test_extract_property_urls(
+        self, sitemap_bytes: bytes, respx_mock: respx.MockRouter, malformed: bool
+    ):
+        """
+        Streams a gzipped partition straight into the parser
+        """
+        url: str = (
+            "https://www.zillow.com/xml/sitemaps/us/hdp/for-sale-by-agent/sitemap-0000.xml.gz"
+        )
+        if malformed:
+            sitemap_bytes = sitemap_bytes.replace(b"</url>", b"", 1)
+
+        respx_mock.get(url).mock(
+            return_value=Response(200, content=gzip.compress(sitemap_bytes))
+        )
+
+        property_set: list = extract_property_urls.fn(url)
+
+        assert [prop["zillow_id"] for prop in property_set] == [
+            "2146997656",
+            "2146994027",
+        ]
@@ -0,0 +1,77 @@
+"""
+Tests the payload spool
+"""
+
+from pathlib import Path
+
+import pytest
+import respx
+from httpx import Response
+
+from zillow.sitemap import collect_sitemap_indexes, extract_sitemap_urls
+from zillow.spool import Spool, SpoolHandle, resolve_bytes, resolve_json, spool
+
+URL: str = (
+    "https://www.zillow.com/xml/sitemaps/us/hdp/for-sale-by-agent/sitemap-0000.xml.gz"
+)
+
+
+class TestSpool:
+
+    def test_put_get_discard(self, tmp_path: Path):
+        """
+        Identical payloads get their own handles, discarding one keeps the other
+        """
+        local = Spool(tmp_path)
+
+        first: SpoolHandle = local.put(b"page")
+        second: SpoolHandle = local.put(b"page")
+
+        assert first.key != second.key
+        assert first.size == 4
+
+        local.discard(first)
+
+        assert local.get(second.key) == b"page"
+        with pytest.raises(FileNotFoundError):
+            local.get(first.key)
+
+    def test_temporary_root(self):
+        """
+        Without a root the spool lives in a temporary directory removed on clear
+        """
+        local = Spool()
+        local.put(b"page")
+        root: Path = local.root
+
+        local.clear()
+
+        assert not root.exists()
+
+    def test_resolve(self):
+        """
+        Payloads resolve whether passed directly or by handle
+        """
+        assert resolve_bytes(b"page") == b"page"
+        assert resolve_bytes(spool.put(b"page")) == b"page"
+        assert resolve_json({"a": 1}) == {"a": 1}
+        assert resolve_json(spool.put(b'{"a": 1}')) == {"a": 1}
+
+
+def test_spooled_task(respx_mock: respx.MockRouter):
+    """
+    A spooled task returns a handle the next task reads from
+    """
+    index: bytes = (
+        b"<sitemapindex><sitemap><loc> https://www.zillow.com/sitemap-0000.xml.gz"
+        b" </loc></sitemap></sitemapindex>"
+    )
+    respx_mock.get(URL).mock(return_value=Response(200, content=index))
+
+    handle = extract_sitemap_urls.fn(URL, spooled=True)
+
+    assert isinstance(handle, SpoolHandle)
+    assert handle.size == len(index)
+    assert collect_sitemap_indexes.fn(handle) == [
+        "https://www.zillow.com/sitemap-0000.xml.gz"
+    ]